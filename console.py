@@ -84,17 +84,19 @@ class HBNBCommand(cmd.Cmd):
         if len(args) < 2:
             print("** instance id missing **")
             return
-        key = "{}.{}".format(args[0], args[1])
-        if key not in storage.all():
+        obj = storage.get(args[0], args[1])
+        if obj is None:
             print("** no instance found **")
         else:
-            print(storage.all()[key])
+            print(obj)
 
     def do_destroy(self, arg):
         """
-        Deletes an instance based on the class name and id.
-        Usage: destroy <class name> <id>
-        Example: destroy User 1234-1234-1234
+        Deletes an instance based on the class name and id. With cascade
+        the instances depending on it are deleted too; with restrict
+        nothing is deleted if any exist.
+        Usage: destroy <class name> <id> [cascade|restrict]
+        Example: destroy State 1234-1234-1234 cascade
         """
         args = arg.split()
         if len(args) == 0:
@@ -106,12 +108,20 @@ class HBNBCommand(cmd.Cmd):
         if len(args) < 2:
             print("** instance id missing **")
             return
-        key = f"{args[0]}.{args[1]}"
-        if key not in storage.all():
+        obj = storage.get(args[0], args[1])
+        if obj is None:
             print("** no instance found **")
-        else:
-            del storage.all()[key]
-            storage.save()
+            return
+        on_delete = args[2] if len(args) > 2 else None
+        if on_delete not in (None, "cascade", "restrict"):
+            print("** unknown delete policy **")
+            return
+        try:
+            storage.delete(obj, on_delete)
+        except ValueError:
+            print("** instance has dependents **")
+            return
+        storage.save()
 
     def do_all(self, arg):
         """
@@ -120,13 +130,11 @@ class HBNBCommand(cmd.Cmd):
         Example: all User
         """
         args = arg.split()
-        instances = storage.all()
         if not args:
-            print([str(v) for v in instances.values()])
+            print([str(v) for v in storage.all().values()])
         elif args[0] in self.classes:
             filtered_instances = [
-                str(v) for v in instances.values()
-                if type(v).__name__ == args[0]
+                str(v) for v in storage.all(args[0]).values()
             ]
             print(filtered_instances)
         else:
@@ -154,7 +162,7 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
         key = "{}.{}".format(args[0], args[1])
-        if key not in storage.all():
+        if storage.get(args[0], args[1]) is None:
             print("** no instance found **")
             return
         if len(args) < 3:
@@ -164,7 +172,8 @@ class HBNBCommand(cmd.Cmd):
             try:
                 attr_dict = ast.literal_eval(args[2])
                 for attr_name, attr_value in attr_dict.items():
-                    if attr_name in ['id', 'created_at', 'updated_at']:
+                    if attr_name in ['id', 'created_at', 'updated_at'] or \
+                            attr_name.startswith('_'):
                         continue
                     self.apply_update(key, attr_name, attr_value)
             except Exception as e:
@@ -176,7 +185,8 @@ class HBNBCommand(cmd.Cmd):
                 print("** value missing **")
                 return
             attr_name, attr_value_str = attr_args[0], attr_args[1]
-            if attr_name in ['id', 'created_at', 'updated_at']:
+            if attr_name in ['id', 'created_at', 'updated_at'] or \
+                    attr_name.startswith('_'):
                 return
             try:
                 attr_value = ast.literal_eval(attr_value_str)
@@ -186,7 +196,7 @@ class HBNBCommand(cmd.Cmd):
 
     def apply_update(self, key, attr_name, attr_value):
         """Helper method to apply update to an instance."""
-        obj = storage.all()[key]
+        obj = storage.get(*key.split(".", 1))
         if isinstance(attr_value, str) and not attr_value.isdigit():
             attr_value = attr_value.strip("\"")
         setattr(obj, attr_name, attr_value)
@@ -206,11 +216,63 @@ class HBNBCommand(cmd.Cmd):
         if class_name not in self.classes:
             print("** class doesn't exist **")
             return
-        count = 0
-        for obj_id in storage.all():
-            if obj_id.startswith(class_name + "."):
-                count += 1
-        print(count)
+        print(storage.count(class_name))
+
+    def do_search(self, arg):
+        """
+        Shows the instances of a class whose text matches every word
+        and "quoted phrase" of a query, best match first.
+        Usage: search <class name> <query>
+        Example: search Review "ocean view" quiet
+        """
+        args = arg.split(" ", 1)
+        if not args[0]:
+            print("** class name missing **")
+            return
+        if args[0] not in self.classes:
+            print("** class doesn't exist **")
+            return
+        if len(args) < 2 or not args[1].strip():
+            print("** query missing **")
+            return
+        if not hasattr(storage, "search"):
+            print("** not supported by this storage **")
+            return
+        try:
+            found = storage.search(args[0], args[1])
+        except ValueError:
+            print("** no text index for class **")
+            return
+        print([str(v) for v in found.values()])
+
+    def do_top(self, arg):
+        """
+        Shows the k instances of a class (10 by default) with the lowest
+        value of an attribute, or the highest with a leading '-', in order.
+        Usage: top <class name> <attribute name> [k]
+        Example: top Place -price_by_night 5
+        """
+        args = arg.split()
+        if not args:
+            print("** class name missing **")
+            return
+        if args[0] not in self.classes:
+            print("** class doesn't exist **")
+            return
+        if len(args) < 2:
+            print("** attribute name missing **")
+            return
+        k = 10
+        if len(args) > 2:
+            if not args[2].isdigit() or int(args[2]) == 0:
+                print("** invalid count **")
+                return
+            k = int(args[2])
+        if not hasattr(storage, "top"):
+            print("** not supported by this storage **")
+            return
+        found = storage.top(args[0], args[1], k)
+        print([str(v) for v in found.values()])
 
     def default(self, line):
         """Handles unrecognized commands, including update from dictionary."""
@@ -259,6 +321,19 @@ class HBNBCommand(cmd.Cmd):
                         command_func(f"{cls_name} {' '.join(args_list)}")
                 elif command == "count":
                     self.do_count(cls_name)
+                elif command == "search":
+                    try:
+                        query = ast.literal_eval(arguments)
+                    except (ValueError, SyntaxError):
+                        query = arguments
+                    self.do_search(f"{cls_name} {query}")
+                elif command == "top":
+                    try:
+                        top_args = ast.literal_eval(f"({arguments},)")
+                    except (ValueError, SyntaxError):
+                        top_args = (arguments,)
+                    self.do_top(" ".join(
+                        [cls_name] + [str(a) for a in top_args]))
                 elif command in ["all", "create", "update"]:
                     self.onecmd(f"{command} {cls_name} {' '.join(args_list)}")
                 else:
@@ -302,11 +377,7 @@ class HBNBCommand(cmd.Cmd):
 
     def count_instances(self, class_name):
         """Counts the number of instances for a given class name."""
-        count = sum(
-            1 for obj in storage.all().values()
-            if obj.__class__.__name__ == class_name
-        )
-        print(count)
+        print(storage.count(class_name))
 
 
 if __name__ == '__main__':
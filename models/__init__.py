@@ -1,7 +1,17 @@
 #!/usr/bin/python3
-"""Creates a unique FileStorage instance for the application."""
+"""Creates a unique storage instance for the application: a FileStorage,
+or a DBStorage when HBNB_TYPE_STORAGE is "db"."""
 
-from models.engine.file_storage import FileStorage
+from os import getenv
 
-storage = FileStorage()
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+    storage.journal = getenv("HBNB_FILE_JOURNAL") == "1"
+    storage.sharded = getenv("HBNB_FILE_SHARDED") == "1"
+    storage.cache_encoded = getenv("HBNB_FILE_CACHE") == "1"
+    storage.epoch_timestamps = getenv("HBNB_FILE_EPOCH") == "1"
 storage.reload()
@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Defines the Amenity class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class Amenity(BaseModel):
     """Represents an Amenity."""
     name = ""
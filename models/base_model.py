@@ -6,11 +6,285 @@ Authors: YASSINE - ANAS
 
 import models
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from os import getenv
+from sys import intern
 
+COMPACT = getenv("HBNB_COMPACT") == "1"
+REFERENCES = frozenset(("id", "state_id", "city_id", "user_id", "place_id",
+                        "amenity_ids"))
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
 
+
+def slotted(cls, bases=None):
+    """Returns a copy of the model class cls built with __slots__.
+
+    Each public class attribute of cls becomes a slot, and its value the
+    default __getattr__ returns while the slot is unset. A root class
+    (one whose bases are not slotted models) also gets a `_key` slot
+    behind the id property holding the storage key "<class name>.<id>"
+    (FileStorage reuses that string instead of building its own), the
+    `_created_at` and `_updated_at` slots behind the created_at and
+    updated_at properties holding epoch microseconds (a datetime is only
+    built when they are read), and an `_extra` slot holding the
+    dictionary of the attributes that have no slot, created on demand.
+    The copy keeps the name of cls and derives from bases (the bases of
+    cls by default), which must be slotted too for instances to carry
+    no __dict__.
+    """
+    bases = cls.__bases__ if bases is None else bases
+    namespace = dict(cls.__dict__)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    defaults = {}
+    for base in reversed(bases):
+        defaults.update(getattr(base, "_defaults", {}))
+    fields = []
+    if not any(hasattr(base, "_defaults") for base in bases):
+        fields = ["_key", "_created_at", "_updated_at", "_extra"]
+        defaults["_extra"] = None
+        namespace.update(__getattr__=_getattr, __setattr__=_setattr,
+                         __str__=_str, _attributes=_attributes,
+                         _timestamp=staticmethod(_decode_stamp),
+                         id=property(_get_id, _set_id),
+                         created_at=_time_property("_created_at",
+                                                   "_updated_at"),
+                         updated_at=_time_property("_updated_at",
+                                                   "_created_at"))
+    for name, value in cls.__dict__.items():
+        if not name.startswith("_") and not hasattr(value, "__get__"):
+            del namespace[name]
+            defaults[name] = value
+            fields.append(name)
+    namespace["__slots__"] = tuple(fields)
+    namespace["_defaults"] = defaults
+    compact_cls = type(cls.__name__, bases, namespace)
+    compact_cls._slots = getattr(compact_cls, "_slots", ()) + tuple(
+        ("id" if name == "_key" else name.lstrip("_"),
+         compact_cls.__dict__[name])
+        for name in fields if name != "_extra")
+    return compact_cls
+
+
+def compact(cls):
+    """Class decorator replacing a model by its slotted() copy when the
+    HBNB_COMPACT environment variable is "1"."""
+    return slotted(cls) if COMPACT else cls
+
+
+def hydrator(cls):
+    """Returns a function building an instance of the model cls from a
+    to_dict() dictionary as cls(**dictionary) does: __class__ left out,
+    created_at and updated_at decoded, the REFERENCES shared. The
+    instance is filled in one go rather than key by key through
+    __setattr__, and is not flagged dirty since it is not stored yet.
+    The slots of a slotted() class are written directly: the key built
+    from the id, the timestamps as epoch microseconds.
+
+    Classes with their own __init__ or __setattr__ are simply called.
+    """
+    if cls.__init__ is not BaseModel.__init__ or \
+            cls.__setattr__ not in (BaseModel.__setattr__, _setattr):
+        return lambda values: cls(**values)
+    decode = cls._timestamp
+    new = object.__new__
+    slotted = hasattr(cls, "_slots")
+    shared = REFERENCES - {"id"} if slotted else REFERENCES
+
+    def prepare(values):
+        state = dict(values)
+        state.pop("__class__", None)
+        for name in ("created_at", "updated_at"):
+            if name in state:
+                state[name] = decode(state[name])
+        for name in shared:
+            if name in state:
+                state[name] = share(state[name])
+        return state
+
+    if not slotted:
+        def build(values):
+            obj = new(cls)
+            obj.__dict__.update(prepare(values))
+            return obj
+        return build
+    setters = {name: slot.__set__ for name, slot in cls._slots}
+    prefix = cls.__name__ + "."
+
+    def build_slotted(values):
+        obj = new(cls)
+        state = prepare(values)
+        if type(state.get("id")) is str:
+            state["id"] = prefix + state["id"]
+        if "created_at" in state and \
+                state["created_at"] == state.get("updated_at"):
+            state["updated_at"] = state["created_at"]
+        extra = None
+        for name, value in state.items():
+            setter = setters.get(name)
+            if setter is not None:
+                setter(obj, value)
+            elif extra is None:
+                extra = {name: value}
+            else:
+                extra[name] = value
+        if extra is not None:
+            object.__setattr__(obj, "_extra", extra)
+        return obj
+    return build_slotted
+
+
+def share(value):
+    """Returns value interned if it is a string, or a list of strings
+    with each of them interned in place, so that equal ids stored in many
+    objects are one string in memory."""
+    if type(value) is str:
+        return intern(value)
+    if type(value) is list:
+        for i, item in enumerate(value):
+            if type(item) is str:
+                value[i] = intern(item)
+    return value
+
+
+def to_epoch(value):
+    """Returns the microseconds from 1970-01-01 to the naive datetime
+    value, read as is (no time zone conversion)."""
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_epoch(value):
+    """Returns the naive datetime value epoch microseconds after
+    1970-01-01 (the inverse of to_epoch)."""
+    return _EPOCH + timedelta(0, 0, value)
+
+
+def encode_time(value, epoch=False):
+    """Returns the datetime, or epoch microseconds, value as epoch
+    microseconds when epoch is set and as an ISO string otherwise."""
+    if type(value) is int:
+        return value if epoch else from_epoch(value).isoformat()
+    return to_epoch(value) if epoch else value.isoformat()
+
+
+def decode_time(value):
+    """Returns the datetime of an ISO string or of epoch microseconds,
+    the two forms encode_time() writes."""
+    if type(value) is int:
+        return from_epoch(value)
+    return datetime.fromisoformat(value)
+
+
+def _stamp(value):
+    """Returns the epoch microseconds of a naive datetime; other values
+    are kept as is."""
+    if type(value) is datetime and value.tzinfo is None:
+        return to_epoch(value)
+    return value
+
+
+def _decode_stamp(value):
+    """Returns what decode_time() reads from value as _stamp() stores
+    it, without building a datetime for epoch microseconds."""
+    if type(value) is int:
+        return value
+    return _stamp(datetime.fromisoformat(value))
+
+
+def _time_property(slot, other):
+    """Returns the property reading the epoch microseconds of the slot
+    named slot as a datetime, and storing a datetime assigned to it as
+    epoch microseconds, the very int of the slot other when equal."""
+    def get(self):
+        value = getattr(self, slot)
+        return from_epoch(value) if type(value) is int else value
+
+    def set(self, value):
+        value = _stamp(value)
+        same = getattr(self, other, None)
+        if type(same) is int and same == value:
+            value = same
+        object.__setattr__(self, slot, value)
+    return property(get, set)
+
+
+def _getattr(self, name):
+    """Returns the class default of an unset slot, or the value of an
+    attribute without a slot."""
+    defaults = type(self)._defaults
+    if name in defaults:
+        return defaults[name]
+    extra = self._extra
+    if extra is None or name not in extra:
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+    return extra[name]
+
+
+def _get_id(self):
+    """Returns the id of a slotted instance, read from its key."""
+    key = self._key
+    return key.partition(".")[2] if type(key) is str else key
+
+
+def _set_id(self, value):
+    """Stores the key of a slotted instance for the id value, or value
+    itself when it is not a string."""
+    if type(value) is str:
+        value = f"{type(self).__name__}.{value}"
+    object.__setattr__(self, "_key", value)
+
+
+def _setattr(self, name, value):
+    """Sets a slot, or an attribute without one in `_extra`, and flags
+    the instance as dirty in storage."""
+    if name in REFERENCES:
+        value = share(value)
+    try:
+        object.__setattr__(self, name, value)
+    except AttributeError:
+        if self._extra is None:
+            object.__setattr__(self, "_extra", {})
+        self._extra[name] = value
+    models.storage.mark_dirty(self, name)
+
+
+def _attributes(self):
+    """Returns a dictionary of the slots set and the attributes
+    without a slot."""
+    found = {}
+    for name, slot in type(self)._slots:
+        try:
+            found[name] = slot.__get__(self)
+        except AttributeError:
+            pass
+    if "id" in found:
+        found["id"] = _get_id(self)
+    if self._extra:
+        found.update(self._extra)
+    return found
+
+
+def _str(self):
+    """Returns the string of a slotted instance, with its timestamps
+    shown as datetimes as BaseModel.__str__ does."""
+    found = self._attributes()
+    for name in ("created_at", "updated_at"):
+        if type(found.get(name)) is int:
+            found[name] = from_epoch(found[name])
+    return "[{}] ({}) {}".format(type(self).__name__, self.id, found)
+
+
+@compact
 class BaseModel:
-    """Represents the base model."""
+    """Represents the base model.
+
+    The ids and foreign keys named in REFERENCES are passed through
+    share() when assigned, by reload() as by the console. _timestamp
+    decodes the created_at and updated_at given to __init__.
+    """
+    _timestamp = staticmethod(decode_time)
 
     def __init__(self, *args, **kwargs):
         """Initializes a new BaseModel instance."""
@@ -19,19 +293,26 @@ class BaseModel:
                 if key == '__class__':
                     continue
                 elif key in ['created_at', 'updated_at']:
-                    value = datetime.fromisoformat(value)
+                    value = self._timestamp(value)
                 setattr(self, key, value)
         else:
             self.id = str(uuid.uuid4())
             self.created_at = self.updated_at = datetime.now()
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """Sets an attribute and flags the instance as dirty in storage."""
+        if name in REFERENCES:
+            value = share(value)
+        super().__setattr__(name, value)
+        models.storage.mark_dirty(self, name)
+
     def __str__(self):
         """Returns the string representation of the BaseModel instance."""
         return "[{}] ({}) {}".format(
             self.__class__.__name__,
             self.id,
-            self.__dict__
+            self._attributes()
         )
 
     def save(self):
@@ -39,10 +320,16 @@ class BaseModel:
         self.updated_at = datetime.now()
         models.storage.save()
 
-    def to_dict(self):
-        """Returns a dictionary containing all keys/values of the instance."""
-        result = dict(self.__dict__)
+    def to_dict(self, *, epoch=False):
+        """Returns a dictionary containing all keys/values of the instance,
+        with created_at and updated_at as ISO strings, or as epoch
+        microseconds when epoch is set."""
+        result = dict(self._attributes())
         result['__class__'] = self.__class__.__name__
-        result['created_at'] = self.created_at.isoformat()
-        result['updated_at'] = self.updated_at.isoformat()
+        result['created_at'] = encode_time(result.get('created_at'), epoch)
+        result['updated_at'] = encode_time(result.get('updated_at'), epoch)
         return result
+
+    def _attributes(self):
+        """Returns the dictionary of the attributes of the instance."""
+        return self.__dict__
@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Defines the City class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class City(BaseModel):
     """Represents a City."""
     state_id = ""
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+"""
+Vectorized reports over the objects of one class, computed with numpy.
+Authors: YASSINE - ANAS
+
+Each report reads a Table: the chosen attributes of every object of a
+class exported once into numpy arrays, and kept until storage.version()
+says an object of the class changed. numpy is only needed here.
+"""
+from models.engine.indexes import as_number
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_tables = {}
+
+
+class Table:
+    """The attributes of the objects of one class as numpy arrays.
+
+    `numbers` maps each numeric attribute to a float64 array with NaN
+    where a value is not a number. `codes` maps each string attribute
+    to an int64 array of indexes into `labels[attr]`, -1 where a value
+    is not a string. Row i of every array belongs to keys[i].
+    """
+
+    def __init__(self, objects, numbers=(), strings=()):
+        """Exports the attributes numbers and strings of the objects of
+        the {key: obj} dictionary objects."""
+        self.keys = list(objects)
+        count = len(self.keys)
+        values = objects.values()
+        self.numbers = {}
+        for attr in numbers:
+            self.numbers[attr] = numpy.fromiter(
+                (_number(getattr(obj, attr, None)) for obj in values),
+                dtype=numpy.float64, count=count)
+        self.codes = {}
+        self.labels = {}
+        for attr in strings:
+            found = {}
+            self.codes[attr] = numpy.fromiter(
+                (_code(found, getattr(obj, attr, None)) for obj in values),
+                dtype=numpy.int64, count=count)
+            self.labels[attr] = list(found)
+
+    def __len__(self):
+        """Returns the number of rows."""
+        return len(self.keys)
+
+
+def _number(value):
+    """Returns value as a float, or NaN when it is not a number."""
+    value = as_number(value)
+    return float("nan") if value is None else value
+
+
+def _code(found, value):
+    """Returns the code of the string value in found, adding it if new,
+    or -1 when value is not a string."""
+    if not isinstance(value, str):
+        return -1
+    return found.setdefault(value, len(found))
+
+
+def table(storage, cls, numbers=(), strings=()):
+    """Returns the Table of the attributes numbers and strings of the
+    objects of cls, reusing the last one built for them until
+    storage.version(cls) changes.
+
+    Raises ImportError when numpy is not installed.
+    """
+    if numpy is None:
+        raise ImportError("analytics needs numpy")
+    name = cls if isinstance(cls, str) else cls.__name__
+    numbers, strings = tuple(numbers), tuple(strings)
+    version = storage.version(name) if hasattr(storage, "version") else None
+    cache_key = (id(storage), name, numbers, strings)
+    cached = _tables.get(cache_key)
+    if version is not None and cached is not None and \
+            cached[0] == version:
+        return cached[1]
+    found = Table(storage.all(name), numbers, strings)
+    if version is not None:
+        _tables[cache_key] = (version, found)
+    return found
+
+
+def group_by(storage, cls, by, attr=None, how="count"):
+    """Returns a dictionary of the how ("count", "sum", "mean", "min" or
+    "max") of the numbers of attr for each string value of by, such as
+    the average price_by_night per city_id. Only count needs no attr;
+    objects without a string by or a number attr are left out."""
+    if how not in ("count", "sum", "mean", "min", "max"):
+        raise ValueError("unknown aggregate: {}".format(how))
+    if how != "count" and attr is None:
+        raise ValueError("{} needs an attribute".format(how))
+    data = table(storage, cls, () if attr is None else (attr,), (by,))
+    codes = data.codes[by]
+    keep = codes >= 0
+    if attr is not None:
+        values = data.numbers[attr]
+        keep &= ~numpy.isnan(values)
+        values = values[keep]
+    codes = codes[keep]
+    size = len(data.labels[by])
+    counts = numpy.bincount(codes, minlength=size)
+    if how == "count":
+        result = counts
+    elif how in ("sum", "mean"):
+        result = numpy.bincount(codes, weights=values, minlength=size)
+        if how == "mean":
+            result = result / numpy.maximum(counts, 1)
+    else:
+        fill = numpy.inf if how == "min" else -numpy.inf
+        result = numpy.full(size, fill)
+        (numpy.minimum if how == "min" else numpy.maximum).at(
+            result, codes, values)
+    return {label: value for label, value, count in
+            zip(data.labels[by], result.tolist(), counts.tolist()) if count}
+
+
+def percentiles(storage, cls, attr, qs=(25, 50, 75)):
+    """Returns a dictionary of the percentiles qs of the numbers of attr,
+    None for each when there are none."""
+    values = table(storage, cls, (attr,)).numbers[attr]
+    values = values[~numpy.isnan(values)]
+    if not len(values):
+        return {q: None for q in qs}
+    return dict(zip(qs, numpy.percentile(values, qs).tolist()))
+
+
+def histogram(storage, cls, attr, bins=10, range=None):
+    """Returns (counts, edges) of the numbers of attr split into bins
+    equal bins over range (their min and max by default)."""
+    values = table(storage, cls, (attr,)).numbers[attr]
+    counts, edges = numpy.histogram(values[~numpy.isnan(values)],
+                                    bins=bins, range=range)
+    return counts.tolist(), edges.tolist()
+
+
+def group_sizes(storage, cls, by):
+    """Returns a dictionary of how many string values of by are held by
+    exactly n objects, for each n, such as how many users wrote one
+    review, two reviews and so on."""
+    codes = table(storage, cls, (), (by,)).codes[by]
+    counts = numpy.bincount(codes[codes >= 0])
+    sizes = numpy.bincount(counts[counts > 0])
+    return {n: int(count) for n, count in enumerate(sizes.tolist())
+            if count}
@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+"""
+Defines the ColumnStore, a columnar copy of some attributes of a class.
+Authors: YASSINE - ANAS
+"""
+import math
+import operator
+from array import array
+from itertools import compress, repeat
+from models.engine.indexes import Ordinals, as_number
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_NAN = float("nan")
+_TESTS = {"eq": operator.eq, "lt": operator.lt, "lte": operator.le,
+          "gt": operator.gt, "gte": operator.ge}
+
+
+class ColumnStore:
+    """Keeps numeric attributes in array('d') columns, with NaN where a
+    value is not a number, and string attributes dictionary-encoded in
+    array('l') columns of codes, with -1 where a value is not a string.
+
+    Row i holds the object numbered i by an Ordinals, so the rows stay
+    dense and a removed object's row is reused. Filters and aggregates
+    read whole columns from contiguous memory: through numpy when it is
+    installed, with plain loops over the arrays otherwise.
+    """
+    operators = ("eq", "lt", "lte", "gt", "gte", "in")
+
+    def __init__(self, numbers=(), strings=()):
+        """Initializes an empty store over the numeric attributes numbers
+        and the string attributes strings."""
+        self.numbers = tuple(numbers)
+        self.strings = tuple(strings)
+        self.attrs = self.numbers + self.strings
+        self.rebuild({})
+
+    def add(self, key, obj):
+        """Writes the row of obj under key."""
+        self.__rows.add(key, obj)
+        row = self.__rows.ordinal(key)
+        if row == len(self.__live):
+            self.__live.append(0)
+            for column in self.__columns.values():
+                column.append(_NAN if column.typecode == "d" else -1)
+        self.__live[row] = 1
+        for attr in self.numbers:
+            value = as_number(getattr(obj, attr, None))
+            self.__columns[attr][row] = _NAN if value is None else value
+        for attr in self.strings:
+            self.__columns[attr][row] = self.__encode(
+                attr, getattr(obj, attr, None))
+
+    def remove(self, key):
+        """Clears the row of key."""
+        row = self.__rows.ordinal(key)
+        if row is None:
+            return
+        self.__rows.remove(key)
+        self.__live[row] = 0
+        for column in self.__columns.values():
+            column[row] = _NAN if column.typecode == "d" else -1
+
+    def rebuild(self, objects):
+        """Writes the rows of every (key, obj) pair of objects from
+        scratch."""
+        self.__rows = Ordinals()
+        self.__live = bytearray()
+        self.__columns = {attr: array("d") for attr in self.numbers}
+        self.__columns.update((attr, array("l")) for attr in self.strings)
+        self.__codes = {attr: {} for attr in self.strings}
+        self.__values = {attr: [] for attr in self.strings}
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def __len__(self):
+        """Returns the number of rows in use."""
+        return self.__live.count(1)
+
+    def column(self, attr):
+        """Returns a copy of the array of attr: floats for a numeric
+        attribute and codes for a string one (see decode). A copy, since
+        a buffer held on the live array would stop it from growing."""
+        return self.__columns[attr][:]
+
+    def decode(self, attr, code):
+        """Returns the string of a code of the column attr, or None."""
+        return None if code < 0 else self.__values[attr][code]
+
+    def rows(self, **filters):
+        """Returns the ascending list of the rows matching every filter.
+
+        Filters are `attr=value` or `attr__op=value` with op one of eq,
+        lt, lte, gt, gte and in; comparisons only hold on numeric
+        columns and only between numbers.
+        """
+        tests = []
+        for name, value in filters.items():
+            attr, _, op = name.partition("__")
+            op = op or "eq"
+            if op not in ColumnStore.operators:
+                raise ValueError("unknown operator: {}".format(name))
+            if attr not in self.__columns:
+                raise KeyError("no column {}".format(attr))
+            tests.append((attr, op, value))
+        if numpy is not None:
+            return self.__rows_numpy(tests)
+        if not tests:
+            return list(compress(range(len(self.__live)), self.__live))
+        rows = None
+        for attr, op, value in tests:
+            rows = self.__filter(rows, attr, op, value)
+            if not rows:
+                break
+        return rows
+
+    def keys(self, rows):
+        """Returns the keys of rows."""
+        return [self.__rows.key(row) for row in rows]
+
+    def count(self, **filters):
+        """Returns how many rows match filters."""
+        if not filters:
+            return len(self)
+        return len(self.rows(**filters))
+
+    def sum(self, attr, rows=None):
+        """Returns the sum of the numbers of the column attr, over rows
+        (every row by default)."""
+        numbers = self.__numbers(attr, rows)
+        if numpy is not None:
+            return float(numpy.nansum(numbers))
+        return math.fsum(v for v in numbers if v == v)
+
+    def mean(self, attr, rows=None):
+        """Returns the mean of the numbers of the column attr over rows,
+        or None when there are none."""
+        numbers = self.__numbers(attr, rows)
+        if numpy is not None:
+            count = int(numpy.count_nonzero(~numpy.isnan(numbers)))
+            total = float(numpy.nansum(numbers))
+        else:
+            numbers = [v for v in numbers if v == v]
+            count, total = len(numbers), math.fsum(numbers)
+        return total / count if count else None
+
+    def group_count(self, attr, rows=None):
+        """Returns a dictionary of how many rows hold each string of the
+        column attr, over rows (every row by default)."""
+        column = self.__columns[attr]
+        counts = {}
+        if numpy is not None:
+            if rows is None:
+                codes = self.__array(attr)[self.__live_mask()]
+            else:
+                codes = self.__array(attr)[numpy.asarray(rows, dtype=int)]
+            found = numpy.bincount(codes + 1)
+            for code, count in enumerate(found.tolist()):
+                if count:
+                    counts[self.decode(attr, code - 1)] = count
+            return counts
+        if rows is None:
+            rows = compress(range(len(self.__live)), self.__live)
+        for row in rows:
+            code = column[row]
+            counts[code] = counts.get(code, 0) + 1
+        return {self.decode(attr, code): count
+                for code, count in counts.items()}
+
+    def __encode(self, attr, value):
+        """Returns the code of a string of attr, adding it if new, or -1
+        when value is not a string."""
+        if not isinstance(value, str):
+            return -1
+        codes = self.__codes[attr]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.__values[attr])
+            self.__values[attr].append(value)
+        return code
+
+    def __target(self, attr, op, value):
+        """Returns the value to compare the column attr with for op: a
+        number, a code, a set of either, or None when nothing matches."""
+        if attr in self.__codes:
+            codes = self.__codes[attr]
+            try:
+                if op == "eq":
+                    return codes.get(value) if isinstance(value, str) \
+                        else None
+                if op == "in":
+                    return {codes[v] for v in value
+                            if isinstance(v, str) and v in codes}
+            except TypeError:
+                return None
+            return None
+        if op == "in":
+            try:
+                return {as_number(v) for v in value} - {None}
+            except TypeError:
+                return None
+        return as_number(value)
+
+    def __filter(self, rows, attr, op, value):
+        """Returns the rows of rows (every row when None) whose attr
+        satisfies op value. Unused rows hold NaN or -1, which satisfy
+        nothing, so the first filter can run over the whole column."""
+        column = self.__columns[attr]
+        target = self.__target(attr, op, value)
+        if target is None or target == set():
+            return []
+        if rows is None:
+            rows, values = range(len(column)), column
+        else:
+            values = map(column.__getitem__, rows)
+        if op == "in":
+            return list(compress(rows, map(target.__contains__, values)))
+        return list(compress(rows, map(_TESTS[op], values, repeat(target))))
+
+    def __rows_numpy(self, tests):
+        """Returns the rows passing tests, with numpy masks."""
+        mask = self.__live_mask()
+        for attr, op, value in tests:
+            target = self.__target(attr, op, value)
+            if target is None or target == set():
+                return []
+            data = self.__array(attr)
+            if op == "eq":
+                mask &= data == target
+            elif op == "in":
+                mask &= numpy.isin(data, list(target))
+            elif op == "lt":
+                mask &= data < target
+            elif op == "lte":
+                mask &= data <= target
+            elif op == "gt":
+                mask &= data > target
+            else:
+                mask &= data >= target
+        return numpy.flatnonzero(mask).tolist()
+
+    def __numbers(self, attr, rows):
+        """Returns the numbers of the column attr over rows, as a numpy
+        array when numpy is installed."""
+        column = self.__columns[attr]
+        if numpy is not None:
+            if rows is None:
+                return self.__array(attr)[self.__live_mask()]
+            return self.__array(attr)[numpy.asarray(rows, dtype=int)]
+        if rows is None:
+            return column
+        return [column[i] for i in rows]
+
+    def __array(self, attr):
+        """Returns a numpy view of the column attr, without copying."""
+        column = self.__columns[attr]
+        if column.typecode == "d":
+            return numpy.frombuffer(column, dtype=numpy.float64)
+        return numpy.frombuffer(column, dtype="i{}".format(column.itemsize))
+
+    def __live_mask(self):
+        """Returns a numpy boolean array of the rows in use."""
+        return numpy.frombuffer(bytes(self.__live), dtype=numpy.uint8) == 1
@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+"""
+Defines the DBStorage class.
+Authors: YASSINE - ANAS
+"""
+import json
+import sqlite3
+from os import getenv
+from models.engine.file_storage import FileStorage
+
+
+class DBStorage:
+    """Stores instances in a SQLite database, one table per class.
+
+    Each row holds the id of an instance and the JSON of its to_dict().
+    Rows are only read when their class or id is asked for, and save()
+    upserts or deletes the rows of the objects changed since the last
+    save instead of rewriting everything.
+    """
+    classes = FileStorage.classes
+    relations = FileStorage.relations
+
+    def __init__(self):
+        """Initializes an unconnected storage for the database file named
+        by HBNB_DB_PATH (hbnb.db by default)."""
+        self.__db_path = getenv("HBNB_DB_PATH", "hbnb.db")
+        self.__session = None
+        self.__objects = {}
+        self.__dirty = set()
+
+    def all(self, cls=None):
+        """Returns a dictionary of all stored objects, or only those of cls
+        (a class or a class name)."""
+        if cls is None:
+            names = list(DBStorage.classes)
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        objects = {}
+        for name in names:
+            rows = self.__session.execute(
+                'SELECT id, data FROM "{}"'.format(name))
+            for obj_id, data in rows:
+                key = f"{name}.{obj_id}"
+                if key in self.__dirty:
+                    continue
+                if key not in self.__objects:
+                    self.__load(key, data)
+                objects[key] = self.__objects[key]
+            for key in self.__dirty:
+                if key.split(".", 1)[0] == name and key in self.__objects:
+                    objects[key] = self.__objects[key]
+        return objects
+
+    def get(self, cls, id):
+        """Returns the object of cls with this id, or None."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = f"{name}.{id}"
+        if key in self.__objects or key in self.__dirty:
+            return self.__objects.get(key)
+        if name not in DBStorage.classes:
+            return None
+        row = self.__session.execute(
+            'SELECT data FROM "{}" WHERE id = ?'.format(name),
+            (id,)).fetchone()
+        if row is None:
+            return None
+        return self.__load(key, row[0])
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls,
+        counting rows in SQL and adjusting for unsaved changes."""
+        if cls is None:
+            return sum(self.count(name) for name in DBStorage.classes)
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in DBStorage.classes:
+            return 0
+        dirty = [key.split(".", 1)[1] for key in self.__dirty
+                 if key.split(".", 1)[0] == name]
+        count = self.__session.execute(
+            'SELECT COUNT(*) FROM "{}" WHERE id NOT IN ({})'.format(
+                name, ", ".join("?" * len(dirty))), dirty).fetchone()[0]
+        return count + sum(f"{name}.{obj_id}" in self.__objects
+                           for obj_id in dirty)
+
+    def new(self, obj):
+        """Adds obj to the current session."""
+        if obj:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self.__objects[key] = obj
+            self.__dirty.add(key)
+
+    def children(self, obj):
+        """Returns a dictionary of the objects referencing obj through one
+        of the `relations` of FileStorage, read through the expression
+        indexes on their foreign keys."""
+        found = {}
+        for name, attr in DBStorage.relations.get(type(obj).__name__, ()):
+            rows = self.__session.execute(
+                'SELECT id, data FROM "{}" '
+                "WHERE json_extract(data, '$.{}') = ?".format(name, attr),
+                (obj.id,))
+            for obj_id, data in rows:
+                key = f"{name}.{obj_id}"
+                if key in self.__dirty:
+                    continue
+                if key not in self.__objects:
+                    self.__load(key, data)
+                found[key] = self.__objects[key]
+            for key in self.__dirty:
+                child = self.__objects.get(key)
+                if key.split(".", 1)[0] == name and child is not None and \
+                        getattr(child, attr, None) == obj.id:
+                    found[key] = child
+        return found
+
+    def delete(self, obj=None, on_delete=None):
+        """Removes obj from the current session, with its dependents if
+        on_delete is "cascade"; with "restrict" raises ValueError and
+        removes nothing if obj has dependents."""
+        if obj is None:
+            return
+        if on_delete == "restrict" and self.children(obj):
+            raise ValueError("{} has dependents".format(obj.id))
+        doomed = [obj]
+        if on_delete == "cascade":
+            seen = {id(obj)}
+            for parent in doomed:
+                for child in self.children(parent).values():
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        doomed.append(child)
+        for obj in doomed:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self.__objects.pop(key, None)
+            self.__dirty.add(key)
+
+    def mark_dirty(self, obj, attr=None):
+        """Flags a stored obj as changed since the last save."""
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        if self.__objects.get(key) is obj:
+            self.__dirty.add(key)
+
+    def save(self):
+        """Upserts or deletes the rows of the objects changed since the
+        last save and commits them."""
+        with self.__session:
+            for key in self.__dirty:
+                name, obj_id = key.split(".", 1)
+                if name not in DBStorage.classes:
+                    continue
+                obj = self.__objects.get(key)
+                if obj is None:
+                    self.__session.execute(
+                        'DELETE FROM "{}" WHERE id = ?'.format(name),
+                        (obj_id,))
+                else:
+                    self.__session.execute(
+                        'INSERT INTO "{}" (id, data) VALUES (?, ?) '
+                        'ON CONFLICT(id) DO UPDATE SET data = excluded.data'
+                        .format(name), (obj_id, json.dumps(obj.to_dict())))
+        self.__dirty.clear()
+
+    def reload(self):
+        """Opens the database, creating the class tables if needed, and
+        starts a new session."""
+        self.close()
+        self.__session = sqlite3.connect(self.__db_path)
+        with self.__session:
+            for name in DBStorage.classes:
+                self.__session.execute(
+                    'CREATE TABLE IF NOT EXISTS "{}" '
+                    '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'.format(name))
+            for children in DBStorage.relations.values():
+                for name, attr in children:
+                    self.__session.execute(
+                        'CREATE INDEX IF NOT EXISTS "{0}_{1}" ON "{0}" '
+                        "(json_extract(data, '$.{1}'))".format(name, attr))
+        self.__objects = {}
+        self.__dirty = set()
+
+    def close(self):
+        """Closes the database connection, dropping unsaved changes."""
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
+    def __load(self, key, data):
+        """Rebuilds the object of one row into the session."""
+        value = json.loads(data)
+        cls = DBStorage.classes[value['__class__']]
+        obj = cls(**value)
+        self.__objects[key] = obj
+        return obj
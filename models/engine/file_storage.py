@@ -3,8 +3,17 @@
 Defines the FileStorage class.
 Authors: YASSINE - ANAS
 """
+import os
 import json
-from models.base_model import BaseModel
+import heapq
+from models.engine import json_stream
+from models.engine import indexes as idx
+from models.engine.indexes import HashIndex, SortedIndex, GridIndex
+from models.engine.indexes import TextIndex, BitmapIndex, AggregateIndex
+from models.engine.columns import ColumnStore
+from models.engine.query import Query
+from models.engine import place_search
+from models.base_model import BaseModel, hydrator
 from models.user import User
 from models.state import State
 from models.city import City
@@ -15,41 +24,705 @@ from models.review import Review
 
 class FileStorage:
     """Serializes instances to a JSON file
-    and deserializes JSON file to instances."""
+    and deserializes JSON file to instances.
+
+    When `journal` is set, save() appends one record per changed object
+    to `<file>.journal` instead of rewriting the whole file, and reload()
+    replays that journal on top of the last checkpoint.
+
+    Objects report their changes through mark_dirty(). With
+    `cache_encoded` set, the JSON text of clean objects is kept so a
+    save only re-encodes what changed, at the cost of holding about
+    the size of the file in memory.
+    With `epoch_timestamps` set, created_at and updated_at are written as
+    epoch microseconds instead of ISO strings; reload() reads both.
+
+    When `sharded` is set, each class lives in its own `<class>.json`
+    file under __shard_dir and is only read the first time the class
+    is asked for through all().
+
+    __by_class indexes __objects per class name, and `indexes` declares
+    the secondary indexes kept for each class as (index type, *args).
+    The bitmap indexes of a class share one Ordinals numbering its keys.
+    `columnar` names the (numeric, string) attributes columns() mirrors.
+    They are rebuilt whenever __objects is replaced (the indexes of a
+    class only once that class is used), so objects should only be
+    added and removed through new() and delete().
+    """
     __file_path = "file.json"
+    __shard_dir = "shards"
     __objects = {}
+    __indexed = None
+    __bulk = False
+    __by_class = {}
+    __indexes = {}
+    __dirty = set()
+    __encoded = {}
+    __loaded = set()
+    __journal_records = 0
+    __changes = 0
+    __versions = {}
+    __hydrators = {}
+    __requested = {}
+    journal = False
+    sharded = False
+    cache_encoded = False
+    epoch_timestamps = False
+    journal_limit = 10000
     classes = {"BaseModel": BaseModel, "User": User, "Place": Place,
                "Amenity": Amenity, "City": City, "Review": Review,
                "State": State}
+    relations = {
+        "State": [("City", "state_id")],
+        "City": [("Place", "city_id")],
+        "User": [("Place", "user_id"), ("Review", "user_id")],
+        "Place": [("Review", "place_id")],
+    }
+    columnar = {
+        "Place": (("price_by_night", "max_guest", "number_rooms",
+                   "number_bathrooms", "latitude", "longitude"),
+                  ("city_id", "user_id")),
+    }
+    indexes = {
+        "User": [(HashIndex, "email")],
+        "City": [(HashIndex, "state_id"),
+                 (AggregateIndex, "state_id")],
+        "Place": [(HashIndex, "city_id"),
+                  (HashIndex, "user_id"),
+                  (SortedIndex, "price_by_night"),
+                  (SortedIndex, "max_guest"),
+                  (SortedIndex, "number_rooms"),
+                  (SortedIndex, "number_bathrooms"),
+                  (GridIndex, "latitude", "longitude"),
+                  (BitmapIndex, "amenity_ids"),
+                  (BitmapIndex, "number_rooms"),
+                  (BitmapIndex, "number_bathrooms"),
+                  (BitmapIndex, "max_guest"),
+                  (AggregateIndex, "city_id", "price_by_night"),
+                  (TextIndex, "name", "description")],
+        "Review": [(HashIndex, "place_id"),
+                   (HashIndex, "user_id"),
+                   (AggregateIndex, "place_id"),
+                   (AggregateIndex, "user_id"),
+                   (TextIndex, "text")],
+    }
+
+    def all(self, cls=None):
+        """Returns the dictionary __objects, or a new dictionary
+        holding only the objects of cls (a class or a class name)."""
+        if cls is None:
+            for name in FileStorage.classes:
+                self.__require(name)
+            return FileStorage.__objects
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__require(name)
+        self.__sync()
+        return dict(FileStorage.__by_class.get(name, {}))
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls."""
+        if cls is None:
+            return len(self.all())
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__require(name)
+        self.__sync()
+        return len(FileStorage.__by_class.get(name, ()))
+
+    def get(self, cls, id):
+        """Returns the object of cls (a class or a class name) with this
+        id, or None."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__require(name)
+        return FileStorage.__objects.get(f"{name}.{id}")
+
+    def lookup(self, cls, attr, value):
+        """Returns a dictionary of the objects of cls whose attr equals
+        value, through a hash index on attr when one is declared."""
+        objects, index = self.__indexed_class(cls, HashIndex, attr)
+        if index is not None:
+            return {key: objects[key] for key in index.lookup(value)}
+        return {key: obj for key, obj in objects.items()
+                if getattr(obj, attr, None) == value}
+
+    def range(self, cls, attr, low=None, high=None, reverse=False):
+        """Returns a dictionary of the objects of cls whose attr is between
+        low and high (both included, None for unbounded), ordered by attr,
+        through a sorted index on attr when one is declared."""
+        objects, index = self.__indexed_class(cls, SortedIndex, attr)
+        if index is not None:
+            return {key: objects[key]
+                    for key in index.range(low, high, reverse)}
+        found = []
+        for key, obj in objects.items():
+            value = idx.as_number(getattr(obj, attr, None))
+            if value is None:
+                continue
+            if (low is None or value >= low) and \
+                    (high is None or value <= high):
+                found.append((value, key))
+        found.sort(reverse=reverse)
+        return {key: objects[key] for value, key in found}
+
+    def within(self, cls, south, west, north, east):
+        """Returns a dictionary of the objects of cls located inside a
+        latitude/longitude box (crossing the antimeridian when west >
+        east), through a grid index when one is declared."""
+        objects, index = self.__indexed_class(
+            cls, GridIndex, "latitude", "longitude")
+        if index is not None:
+            return {key: objects[key]
+                    for key in index.within(south, west, north, east)}
+        return {key: obj for key, obj in objects.items()
+                if self.__point(obj) is not None and
+                idx.in_box(*self.__point(obj), south, west, north, east)}
+
+    def nearest(self, cls, lat, lng, k=10):
+        """Returns a dictionary of the k objects of cls closest to a point,
+        closest first, through a grid index when one is declared."""
+        objects, index = self.__indexed_class(
+            cls, GridIndex, "latitude", "longitude")
+        if index is not None:
+            found = index.nearest(lat, lng, k)
+        else:
+            found = heapq.nsmallest(k, (
+                (idx.distance_km(lat, lng, *self.__point(obj)), key)
+                for key, obj in objects.items()
+                if self.__point(obj) is not None))
+        return {key: objects[key] for distance, key in found}
+
+    def search(self, cls, query, limit=None):
+        """Returns a dictionary of the objects of cls whose indexed text
+        holds every word and "quoted phrase" of query, best match first.
+
+        The text index of cls is only built by the first search of cls,
+        then kept in sync like the other indexes.
+
+        Raises ValueError when no text index is declared for cls.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        objects, index = self.__indexed_class(name, TextIndex)
+        if index is None:
+            for spec in FileStorage.indexes.get(name, ()):
+                if spec[0] is TextIndex:
+                    index = TextIndex(*spec[1:])
+                    index.rebuild(objects)
+                    self.__class_indexes(name).append(index)
+                    break
+            else:
+                raise ValueError("no text index for {}".format(cls))
+        return {key: objects[key] for score, key in index.search(query, limit)}
+
+    def tally(self, cls, attr, value, total=None):
+        """Returns how many objects of cls have attr equal to value, or
+        the sum of their total attribute, read from an aggregate index
+        when one is declared.
+
+        Example: storage.tally(Review, "place_id", place.id)
+        """
+        objects, index = self.__aggregate(cls, attr, total)
+        if index is not None:
+            if total is None:
+                return index.count(value)
+            return index.total(total, value)
+        found = [obj for obj in objects.values()
+                 if getattr(obj, attr, None) == value]
+        if total is None:
+            return len(found)
+        return sum(idx.as_number(getattr(obj, total, None)) or 0
+                   for obj in found)
 
-    def all(self):
-        """Returns the dictionary __objects."""
-        return FileStorage.__objects
+    def tallies(self, cls, attr):
+        """Returns a dictionary of how many objects of cls hold each value
+        of attr, such as the number of places per city."""
+        objects, index = self.__aggregate(cls, attr)
+        if index is not None:
+            return index.counts()
+        counts = {}
+        for obj in objects.values():
+            value = getattr(obj, attr, None)
+            try:
+                counts[value] = counts.get(value, 0) + 1
+            except TypeError:
+                continue
+        return counts
+
+    def top(self, cls, attr, k=10, **filters):
+        """Returns an ordered dictionary of the k objects of cls with the
+        lowest attr, or the highest if attr starts with '-', among those
+        matching the query filters. The planner walks a sorted index on
+        attr or keeps a bounded heap, never sorting all the candidates.
+
+        Example: storage.top(Place, "price_by_night", 20, city_id=city.id)
+        """
+        return Query(self, cls).filter(**filters).order_by(attr).limit(
+            k).all()
+
+    def top_tallies(self, cls, attr, k=10):
+        """Returns an ordered dictionary of the k values of attr held by
+        the most objects of cls, with their counts, such as the ids of
+        the most reviewed places: storage.top_tallies(Review, "place_id")
+        """
+        objects, index = self.__aggregate(cls, attr)
+        if index is not None:
+            return dict(index.top(k))
+        return dict(heapq.nsmallest(
+            k, self.tallies(cls, attr).items(),
+            key=lambda item: (-item[1], str(item[0]))))
+
+    def distinct(self, cls, attr):
+        """Returns how many different values of attr the objects of cls
+        hold, such as the number of users who wrote a review."""
+        objects, index = self.__aggregate(cls, attr)
+        if index is not None:
+            return index.distinct()
+        return len(self.tallies(cls, attr))
+
+    def facets(self, cls, attr, **filters):
+        """Returns a dictionary of how many objects of cls hold each value
+        of attr, among those matching the query filters if any, counted
+        from a bitmap index on attr when one is declared."""
+        objects, index = self.__indexed_class(cls, BitmapIndex, attr)
+        if filters:
+            keys = Query(self, cls).filter(**filters).all()
+        else:
+            keys = objects
+        if index is not None:
+            return index.facets(index.bitmap_of(keys) if filters else None)
+        counts = {}
+        for key in keys:
+            value = getattr(objects[key], attr, None)
+            try:
+                counts[value] = counts.get(value, 0) + 1
+            except TypeError:
+                continue
+        return counts
+
+    def search_places(self, **criteria):
+        """Returns an ordered dictionary of one page of the places matching
+        criteria; see place_search.search_places for the criteria.
+
+        Example: storage.search_places(city_id=city.id, price_max=120,
+                                       guests=2, amenities=[wifi.id],
+                                       order="price", limit=20)
+        """
+        return place_search.search_places(self, **criteria)
+
+    def query(self, cls, **filters):
+        """Returns a Query over the objects of cls, filtered by filters.
+
+        Example: storage.query(Place, city_id=city.id,
+                               price_by_night__lte=120).order_by(
+                                   "price_by_night").limit(10).all()
+        """
+        return Query(self, cls).filter(**filters)
+
+    def columns(self, cls):
+        """Returns the ColumnStore mirroring the `columnar` attributes of
+        cls, or None when none are declared. It is only built the first
+        time it is asked for, then kept in sync like the indexes, the
+        same store being rebuilt whenever __objects is replaced.
+
+        Example: store = storage.columns(Place)
+                 store.mean("price_by_night", store.rows(max_guest__gte=4))
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in FileStorage.columnar:
+            return None
+        objects, indexes = self.indexes_for(name)
+        for index in indexes:
+            if isinstance(index, ColumnStore):
+                return index
+        store = ColumnStore(*FileStorage.columnar[name])
+        store.rebuild(objects)
+        indexes.append(store)
+        FileStorage.__requested[name] = [store]
+        return store
+
+    def version(self, cls):
+        """Returns a number that changes whenever an object of cls is
+        added, removed or modified, to tell when results derived from
+        the objects of cls are stale."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__require(name)
+        self.__sync()
+        return FileStorage.__versions.get(name, 0)
+
+    def indexes_for(self, cls):
+        """Returns the live {key: obj} dictionary of the objects of cls and
+        the list of indexes kept over them; neither may be modified."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__require(name)
+        self.__sync()
+        return (FileStorage.__by_class.get(name, {}),
+                self.__class_indexes(name))
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id."""
         if obj:
-            key = f"{obj.__class__.__name__}.{obj.id}"
-            self.__objects[key] = obj
+            key = self.__key(obj)
+            self.__add(key, obj)
+            FileStorage.__dirty.add(key)
+
+    def children(self, obj):
+        """Returns a dictionary of the objects referencing obj through one
+        of the `relations` declared for its class."""
+        found = {}
+        for child, attr in FileStorage.relations.get(type(obj).__name__, ()):
+            found.update(self.lookup(child, attr, obj.id))
+        return found
+
+    def delete(self, obj=None, on_delete=None):
+        """Removes obj from __objects if it is stored.
+
+        With on_delete="cascade" every object depending on obj through
+        `relations` is removed as well; with on_delete="restrict" nothing
+        is removed and ValueError is raised if obj has dependents.
+        """
+        if obj is None:
+            return
+        if on_delete == "restrict" and self.children(obj):
+            raise ValueError("{} has dependents".format(obj.id))
+        doomed = [obj]
+        if on_delete == "cascade":
+            seen = {id(obj)}
+            for parent in doomed:
+                for child in self.children(parent).values():
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        doomed.append(child)
+        for obj in doomed:
+            key = self.__key(obj)
+            if self.__remove(key) is not None:
+                FileStorage.__dirty.add(key)
+            FileStorage.__encoded.pop(id(obj), None)
+
+    def mark_dirty(self, obj, attr=None):
+        """Flags a stored obj as changed since the last save and updates
+        the indexes reading attr (all of them when attr is None)."""
+        FileStorage.__encoded.pop(id(obj), None)
+        name = obj.__class__.__name__
+        key = self.__key(obj)
+        if FileStorage.__objects.get(key) is obj:
+            FileStorage.__dirty.add(key)
+            self.__sync()
+            self.__touch(name)
+            for index in FileStorage.__indexes.get(name, ()):
+                if attr is None or attr in index.attrs:
+                    index.remove(key)
+                    index.add(key, obj)
 
     def save(self):
-        """Serializes __objects to the JSON file (path: __file_path)."""
-        obj_dict = {}
-        for key, obj in FileStorage.__objects.items():
-            obj_dict[key] = obj.to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(obj_dict, f)
+        """Persists the pending changes.
+
+        Only the files holding a dirty object are touched, besides a
+        missing unsharded file, which is written whole. In journal mode
+        the changes are appended to their journal until the journals grow
+        past `journal_limit` records, then a checkpoint is taken.
+        """
+        segments = {}
+        for key in FileStorage.__dirty:
+            segments.setdefault(self.__segment(key), []).append(key)
+        FileStorage.__dirty.clear()
+        if not self.sharded and not os.path.exists(self.__file_path):
+            segments.setdefault(None, [])
+        for segment, keys in segments.items():
+            path = self.__path(segment)
+            if self.journal and os.path.exists(path):
+                self.__append(path, keys)
+            else:
+                self.__require(segment)
+                self.__write(segment)
+        if FileStorage.__journal_records > self.journal_limit:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Serializes __objects to the JSON file (path: __file_path), or
+        to one file per class when sharded, and discards the journals
+        they now supersede. When sharded, only the classes read, held
+        in memory or with a journal are rewritten, so unread classes
+        stay unread."""
+        if self.sharded:
+            self.__sync()
+            for name in FileStorage.classes:
+                if name in FileStorage.__loaded or \
+                        FileStorage.__by_class.get(name) or \
+                        os.path.exists(self.__path(name) + ".journal"):
+                    self.__require(name)
+                    self.__write(name)
+        else:
+            self.__write(None)
+        FileStorage.__journal_records = 0
+        FileStorage.__dirty.clear()
 
     def reload(self):
-        """Deserializes the JSON file to __objects, if file exists."""
+        """Deserializes the JSON file to __objects, if file exists,
+        then replays the journal written since that checkpoint.
+
+        When sharded, the class files are only marked as unread; each
+        one is deserialized the first time its class is needed.
+        Otherwise the objects are read without touching the indexes,
+        which are all recomputed in bulk on the next access.
+        """
+        FileStorage.__journal_records = 0
+        FileStorage.__loaded = set()
+        if not self.sharded:
+            FileStorage.__bulk = True
+            try:
+                self.__read(FileStorage.__file_path, False)
+            finally:
+                FileStorage.__bulk = False
+                FileStorage.__indexed = None
+
+    def __require(self, name):
+        """Deserializes the file of class name if it was not read yet."""
+        if self.sharded and name not in FileStorage.__loaded:
+            FileStorage.__loaded.add(name)
+            self.__read(self.__path(name), True)
+
+    def __segment(self, key):
+        """Returns the class name whose file holds key, None if unsharded."""
+        return key.split(".", 1)[0] if self.sharded else None
+
+    def __path(self, segment):
+        """Returns the path of the JSON file for a segment."""
+        if segment is None:
+            return self.__file_path
+        return os.path.join(self.__shard_dir, segment + ".json")
+
+    def __write(self, segment):
+        """Rewrites the JSON file of a segment, streaming one object at a
+        time, and removes its journal."""
+        if segment is None:
+            members = FileStorage.__objects
+        else:
+            self.__sync()
+            members = FileStorage.__by_class.get(segment, {})
+        entries = ((key, self.__encode(obj)) for key, obj in members.items())
+        path = self.__path(segment)
+        if segment is not None:
+            os.makedirs(self.__shard_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json_stream.write_object(f, entries)
+        os.replace(tmp_path, path)
+        try:
+            os.remove(path + ".journal")
+        except FileNotFoundError:
+            pass
+
+    def __append(self, path, keys):
+        """Appends one journal record per key to the journal of path."""
+        with open(path + ".journal", 'a') as f:
+            for key in keys:
+                obj = FileStorage.__objects.get(key)
+                if obj is None:
+                    record = '{"op": "delete", "key": %s}' % json.dumps(key)
+                else:
+                    record = '{"op": "set", "key": %s, "data": %s}' % (
+                        json.dumps(key), self.__encode(obj))
+                f.write(record + "\n")
+        FileStorage.__journal_records += len(keys)
+
+    def __read(self, path, keep_dirty):
+        """Deserializes the JSON file at path entry by entry, so only the
+        live objects and one raw entry are in memory, then replays the
+        journal of path.
+
+        With keep_dirty, objects changed in memory since the last save
+        are not overwritten by their stored copy.
+        """
         try:
-            with open(FileStorage.__file_path, 'r') as f:
-                obj_dict = json.load(f)
-            for key, value in obj_dict.items():
-                cls_name = value['__class__']
-                if cls_name in FileStorage.classes:
-                    cls = FileStorage.classes[cls_name]
-                    obj = cls(**value)
-                    FileStorage.__objects[key] = obj
+            with open(path, 'r') as f:
+                for key, value in json_stream.iter_object(f):
+                    if not (keep_dirty and key in FileStorage.__dirty):
+                        self.__load(key, value)
         except FileNotFoundError:
             pass
+        journal_path = path + ".journal"
+        try:
+            with open(journal_path, 'rb') as f:
+                valid = 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    valid += len(line)
+                    FileStorage.__journal_records += 1
+                    if keep_dirty and record["key"] in FileStorage.__dirty:
+                        continue
+                    if record["op"] == "delete":
+                        self.__remove(record["key"])
+                    else:
+                        self.__load(record["key"], record["data"])
+        except FileNotFoundError:
+            return
+        if valid < os.path.getsize(journal_path):
+            os.truncate(journal_path, valid)
+
+    def __load(self, key, value):
+        """Rebuilds one serialized object into __objects, through the
+        hydrator() of its class, built the first time it is needed."""
+        cls = FileStorage.classes.get(value['__class__'])
+        if cls is not None:
+            build = FileStorage.__hydrators.get(cls)
+            if build is None:
+                build = FileStorage.__hydrators[cls] = hydrator(cls)
+            obj = build(value)
+            if hasattr(cls, "_slots"):
+                own = self.__key(obj)
+                key = own if own == key else key
+            self.__add(key, obj)
+
+    @staticmethod
+    def __key(obj):
+        """Returns the key of obj: the string a slotted model keeps, or
+        "<class name>.<id>"."""
+        if hasattr(type(obj), "_slots"):
+            key = getattr(obj, "_key", None)
+            if type(key) is str:
+                return key
+        return f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+
+    def __indexed_class(self, cls, kind, *attrs):
+        """Returns the {key: obj} dictionary of class cls and its index of
+        type kind over attrs (over any attributes when attrs is empty), or
+        None when no such index is declared."""
+        objects, indexes = self.indexes_for(cls)
+        for index in indexes:
+            if isinstance(index, kind) and attrs in ((), index.attrs):
+                return objects, index
+        return objects, None
+
+    def __aggregate(self, cls, attr, total=None):
+        """Returns the {key: obj} dictionary of class cls and its aggregate
+        index grouping by attr (and summing total if given), or None."""
+        objects, indexes = self.indexes_for(cls)
+        for index in indexes:
+            if isinstance(index, AggregateIndex) and index.attr == attr \
+                    and total in (None,) + index.summed:
+                return objects, index
+        return objects, None
+
+    @staticmethod
+    def __point(obj):
+        """Returns the (latitude, longitude) of obj, or None."""
+        lat = idx.as_number(getattr(obj, "latitude", None))
+        lng = idx.as_number(getattr(obj, "longitude", None))
+        if lat is None or lng is None:
+            return None
+        return lat, lng
+
+    def __add(self, key, obj):
+        """Stores obj under key in __objects and the class index."""
+        old = FileStorage.__objects.get(key)
+        if old is not None and old is not obj:
+            FileStorage.__encoded.pop(id(old), None)
+        if FileStorage.__bulk:
+            FileStorage.__objects[key] = obj
+            return
+        self.__sync()
+        name = key.split(".", 1)[0]
+        FileStorage.__objects[key] = obj
+        FileStorage.__by_class.setdefault(name, {})[key] = obj
+        self.__touch(name)
+        for index in FileStorage.__indexes.get(name, ()):
+            index.remove(key)
+            index.add(key, obj)
+
+    def __remove(self, key):
+        """Removes key from __objects and the class index, returning the
+        object it held or None."""
+        if not FileStorage.__bulk:
+            self.__sync()
+        obj = FileStorage.__objects.pop(key, None)
+        if obj is not None:
+            FileStorage.__encoded.pop(id(obj), None)
+        if obj is not None and not FileStorage.__bulk:
+            name = key.split(".", 1)[0]
+            self.__touch(name)
+            FileStorage.__by_class.get(name, {}).pop(key, None)
+            for index in FileStorage.__indexes.get(name, ()):
+                index.remove(key)
+        return obj
+
+    def __sync(self):
+        """Rebuilds the class index if __objects was replaced, and drops
+        the declared indexes, which __class_indexes() then rebuilds one
+        class at a time, when that class is asked for (right away for
+        the classes whose column store was handed out)."""
+        if FileStorage.__indexed is FileStorage.__objects:
+            return
+        by_class = {}
+        for key, obj in FileStorage.__objects.items():
+            by_class.setdefault(key.split(".", 1)[0], {})[key] = obj
+        FileStorage.__by_class = by_class
+        FileStorage.__indexes = {}
+        FileStorage.__changes += 1
+        FileStorage.__versions = dict.fromkeys(FileStorage.classes,
+                                               FileStorage.__changes)
+        FileStorage.__indexed = FileStorage.__objects
+        for name in FileStorage.__requested:
+            self.__class_indexes(name)
+
+    def __class_indexes(self, name):
+        """Returns the indexes of class name, built from its `indexes`
+        specs the first time they are needed since __objects was
+        replaced. Until then, changes to the class need no upkeep.
+        Text indexes are left to search(), and the stores columns()
+        handed out are rebuilt along."""
+        self.__sync()
+        found = FileStorage.__indexes.get(name)
+        if found is not None:
+            return found
+        found = [spec[0](*spec[1:])
+                 for spec in FileStorage.indexes.get(name, ())
+                 if spec[0] is not TextIndex]
+        bitmaps = [index for index in found
+                   if isinstance(index, BitmapIndex)]
+        if bitmaps:
+            ordinals = idx.Ordinals()
+            for index in bitmaps:
+                index.ordinals = ordinals
+            found.insert(0, ordinals)
+        found.extend(FileStorage.__requested.get(name, ()))
+        objects = FileStorage.__by_class.get(name, {})
+        for index in found:
+            index.rebuild(objects)
+        FileStorage.__indexes[name] = found
+        return found
+
+    @staticmethod
+    def __touch(name):
+        """Moves the version of class name forward."""
+        FileStorage.__changes += 1
+        FileStorage.__versions[name] = FileStorage.__changes
+
+    def __encode(self, obj):
+        """Returns the JSON text of obj.to_dict(), with epoch timestamps
+        if `epoch_timestamps` is set, cached while clean when
+        `cache_encoded` is set. Lists and dicts can change in place,
+        unseen by mark_dirty(), so a shallow copy of those is cached
+        along and the text only reused while they still compare equal;
+        an object holding a list or dict of containers is not cached."""
+        cached = FileStorage.__encoded.get(id(obj))
+        if cached is not None and cached[0] is obj and all(
+                getattr(obj, name, None) == value
+                for name, value in cached[2]):
+            return cached[1]
+        if self.epoch_timestamps:
+            values = obj.to_dict(epoch=True)
+        else:
+            values = obj.to_dict()
+        text = json.dumps(values)
+        if self.cache_encoded:
+            copies = tuple((name, type(value)(value))
+                           for name, value in values.items()
+                           if type(value) in (list, dict))
+            items = (item for name, value in copies for item in
+                     (value.values() if type(value) is dict else value))
+            if not any(type(item) in (list, dict) for item in items):
+                FileStorage.__encoded[id(obj)] = (obj, text, copies)
+        return text
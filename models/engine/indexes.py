@@ -0,0 +1,940 @@
+#!/usr/bin/python3
+"""
+Defines the secondary indexes FileStorage keeps over model attributes.
+Authors: YASSINE - ANAS
+
+Every index follows the same protocol: `attrs` names the attributes it
+reads, add() and remove() maintain it one object at a time, and
+rebuild() fills it in bulk from a {key: obj} dictionary.
+"""
+import re
+import heapq
+import math
+from bisect import bisect_left, bisect_right, insort
+
+EARTH_RADIUS_KM = 6371.0088
+_word = re.compile(r"\w+")
+_phrase = re.compile(r'"([^"]*)"')
+
+
+class _Top:
+    """Sorts after every key, to bound a value range on the right."""
+
+    def __gt__(self, other):
+        return True
+
+    def __lt__(self, other):
+        return False
+
+
+_TOP = _Top()
+
+
+def as_number(value):
+    """Returns value if it is an int or float other than NaN, else None."""
+    if type(value) not in (int, float) or value != value:
+        return None
+    return value
+
+
+def bit_count(bits):
+    """Returns the number of bits set in the int bits (int.bit_count()
+    needs Python 3.10)."""
+    return bin(bits).count("1")
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Returns the great-circle distance between two points in km."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2)
+         * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def tokenize(text):
+    """Returns the lowercase words of text."""
+    return _word.findall(text.lower())
+
+
+def in_box(lat, lng, south, west, north, east):
+    """Tells if a point is inside a box, which crosses the antimeridian
+    when west > east."""
+    if not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lng <= east
+    return lng >= west or lng <= east
+
+
+class HashIndex:
+    """Maps each value of one attribute to the keys of the objects holding
+    it. Unhashable values are left out of the index."""
+
+    def __init__(self, attr):
+        """Initializes an empty index over attr."""
+        self.attr = attr
+        self.attrs = (attr,)
+        self.__values = {}
+        self.__keys = {}
+
+    def add(self, key, obj):
+        """Indexes obj under key."""
+        value = getattr(obj, self.attr, None)
+        try:
+            keys = self.__keys.setdefault(value, set())
+        except TypeError:
+            return
+        keys.add(key)
+        self.__values[key] = value
+
+    def remove(self, key):
+        """Removes key from the index."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        keys = self.__keys[value]
+        keys.discard(key)
+        if not keys:
+            del self.__keys[value]
+
+    def rebuild(self, objects):
+        """Indexes every (key, obj) pair of objects from scratch."""
+        self.__values = {}
+        self.__keys = {}
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def lookup(self, value):
+        """Returns the set of keys whose attribute equals value."""
+        try:
+            return set(self.__keys.get(value, ()))
+        except TypeError:
+            return set()
+
+    def count(self, value):
+        """Returns how many keys have an attribute equal to value."""
+        try:
+            return len(self.__keys.get(value, ()))
+        except TypeError:
+            return 0
+
+    def plan(self, predicates):
+        """Returns (estimate, covered predicates, fetch) to answer one eq
+        or in predicate of predicates, or None when none applies. fetch()
+        returns the matching keys."""
+        for op, value in predicates:
+            try:
+                if op == "eq":
+                    hash(value)
+                    return (self.count(value), [(op, value)],
+                            lambda reverse=False: self.lookup(value))
+                if op == "in":
+                    values = set(value)
+                    return (sum(self.count(v) for v in values), [(op, value)],
+                            lambda reverse=False: set().union(
+                                *(self.lookup(v) for v in values)))
+            except TypeError:
+                continue
+        return None
+
+
+class SortedIndex:
+    """Keeps the keys of the objects ordered by one numeric attribute.
+
+    Entries are (value, key) pairs kept in sorted blocks of about
+    block_size entries, with the last entry of each block in a list of
+    its own: an update is two binary searches and an insertion into one
+    block, and a range query walks the blocks from two binary searches.
+    Added entries wait unsorted until the next read, so that a burst of
+    new objects, each indexed then moved by its first assignments, only
+    sorts its final values once. Values that are not int or float are
+    left out.
+    """
+    ordered = True
+    block_size = 1000
+
+    def __init__(self, attr):
+        """Initializes an empty index over attr."""
+        self.attr = attr
+        self.attrs = (attr,)
+        self.__values = {}
+        self.__pending = {}
+        self.__blocks = []
+        self.__lasts = []
+
+    def add(self, key, obj):
+        """Indexes obj under key."""
+        value = self.__value(obj)
+        if value is not None:
+            self.__values[key] = value
+            self.__pending[key] = value
+
+    def remove(self, key):
+        """Removes key from the index."""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        if self.__pending.pop(key, None) is not None:
+            return
+        entry = (value, key)
+        i = bisect_left(self.__lasts, entry)
+        block = self.__blocks[i]
+        del block[bisect_left(block, entry)]
+        if not block:
+            del self.__blocks[i]
+            del self.__lasts[i]
+        else:
+            self.__lasts[i] = block[-1]
+
+    def rebuild(self, objects):
+        """Indexes every (key, obj) pair of objects with a single sort."""
+        self.__values = {}
+        for key, obj in objects.items():
+            value = self.__value(obj)
+            if value is not None:
+                self.__values[key] = value
+        self.__pending = {}
+        self.__fill()
+
+    def range(self, low=None, high=None, reverse=False,
+              low_open=False, high_open=False):
+        """Yields the keys whose value is between low and high, included
+        unless low_open or high_open and None meaning unbounded, in
+        ascending order of value or descending when reverse is set."""
+        (first, start), (last, stop) = self.__bounds(
+            low, high, low_open, high_open)
+        blocks = self.__blocks
+        if last == len(blocks):
+            last, stop = last - 1, None
+        steps = range(last, first - 1, -1) if reverse else \
+            range(first, last + 1)
+        for i in steps:
+            entries = blocks[i][start if i == first else 0:
+                                stop if i == last else None]
+            for value, key in reversed(entries) if reverse else entries:
+                yield key
+
+    def count(self, low=None, high=None, low_open=False, high_open=False):
+        """Returns how many keys have a value between low and high."""
+        (first, start), (last, stop) = self.__bounds(
+            low, high, low_open, high_open)
+        if start is None:
+            return 0
+        if stop is None:
+            stop, last = 0, len(self.__blocks)
+        if (first, start) >= (last, stop):
+            return 0
+        if first == last:
+            return stop - start
+        return (sum(map(len, self.__blocks[first:last])) - start) + stop
+
+    def plan(self, predicates):
+        """Returns (estimate, covered predicates, fetch) to answer the
+        numeric comparisons of predicates, or a numeric in predicate,
+        or None when none applies. fetch(reverse) yields the matching
+        keys ordered by value."""
+        bounds = [None, None, False, False]
+        covered = []
+        for op, value in predicates:
+            value = as_number(value)
+            if value is None or op not in ("eq", "lt", "lte", "gt", "gte"):
+                continue
+            covered.append((op, value))
+            if op in ("eq", "gt", "gte"):
+                low, low_open = bounds[0], bounds[2]
+                if low is None or value > low or \
+                        (value == low and op == "gt" and not low_open):
+                    bounds[0], bounds[2] = value, op == "gt"
+            if op in ("eq", "lt", "lte"):
+                high, high_open = bounds[1], bounds[3]
+                if high is None or value < high or \
+                        (value == high and op == "lt" and not high_open):
+                    bounds[1], bounds[3] = value, op == "lt"
+        if covered:
+            low, high, low_open, high_open = bounds
+            return (self.count(*bounds), covered,
+                    lambda reverse=False: self.range(
+                        low, high, reverse, low_open, high_open))
+        for op, value in predicates:
+            if op != "in":
+                continue
+            try:
+                values = sorted({as_number(v) for v in value} - {None})
+            except TypeError:
+                continue
+            return (sum(self.count(v, v) for v in values), [(op, value)],
+                    lambda reverse=False: (
+                        key for v in (values[::-1] if reverse else values)
+                        for key in self.range(v, v, reverse)))
+        return None
+
+    def __bounds(self, low, high, low_open=False, high_open=False):
+        """Returns the (block, offset) positions of the first entry with
+        a value between low and high and of the entry right after the
+        last one, None as the offset meaning the end of every block."""
+        self.__sort()
+        start = (0, 0)
+        if low is not None:
+            if low_open:
+                start = self.__position((low, _TOP), bisect_right)
+            else:
+                start = self.__position((low,), bisect_left)
+        stop = (len(self.__blocks), None)
+        if high is not None:
+            if high_open:
+                stop = self.__position((high,), bisect_left)
+            else:
+                stop = self.__position((high, _TOP), bisect_right)
+        return start, stop
+
+    def __position(self, entry, bisect):
+        """Returns the (block, offset) position bisect finds for entry,
+        (number of blocks, None) past the last entry."""
+        i = bisect(self.__lasts, entry)
+        if i == len(self.__blocks):
+            return i, None
+        return i, bisect(self.__blocks[i], entry)
+
+    def __sort(self):
+        """Moves the pending entries into the blocks, with one sort of
+        every entry when they are many."""
+        if not self.__pending:
+            return
+        if len(self.__pending) * 8 > len(self.__values):
+            self.__pending = {}
+            self.__fill()
+            return
+        pending = sorted((value, key)
+                         for key, value in self.__pending.items())
+        self.__pending = {}
+        for entry in pending:
+            i = bisect_left(self.__lasts, entry)
+            if i == len(self.__blocks):
+                if not self.__blocks:
+                    self.__blocks.append([])
+                    self.__lasts.append(entry)
+                i -= 1
+            block = self.__blocks[i]
+            insort(block, entry)
+            self.__lasts[i] = block[-1]
+            if len(block) > 2 * self.block_size:
+                half = len(block) // 2
+                self.__blocks[i:i + 1] = [block[:half], block[half:]]
+                self.__lasts[i:i + 1] = [block[half - 1], block[-1]]
+
+    def __fill(self):
+        """Sorts every entry into new blocks."""
+        entries = sorted((value, key) for key, value in self.__values.items())
+        size = self.block_size
+        self.__blocks = [entries[i:i + size]
+                         for i in range(0, len(entries), size)]
+        self.__lasts = [block[-1] for block in self.__blocks]
+
+    def __value(self, obj):
+        """Returns the indexable value of obj, or None."""
+        return as_number(getattr(obj, self.attr, None))
+
+
+class GridIndex:
+    """Buckets the keys of the objects into square cells of `cell` degrees
+    by a latitude and a longitude attribute.
+
+    A bounding box only visits the cells it overlaps, and a nearest
+    neighbour search visits rings of cells around the point until no
+    unvisited cell can hold anything closer.
+    """
+
+    def __init__(self, lat_attr, lng_attr, cell=0.25):
+        """Initializes an empty index over lat_attr and lng_attr."""
+        self.attrs = (lat_attr, lng_attr)
+        self.cell = cell
+        self.__columns = math.ceil(360 / cell)
+        self.__points = {}
+        self.__cells = {}
+
+    def add(self, key, obj):
+        """Indexes obj under key."""
+        lat = as_number(getattr(obj, self.attrs[0], None))
+        lng = as_number(getattr(obj, self.attrs[1], None))
+        if lat is None or lng is None or not -90 <= lat <= 90:
+            return
+        self.__points[key] = (lat, lng)
+        self.__cells.setdefault(self.__cell_of(lat, lng), set()).add(key)
+
+    def remove(self, key):
+        """Removes key from the index."""
+        if key not in self.__points:
+            return
+        cell = self.__cell_of(*self.__points.pop(key))
+        keys = self.__cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self.__cells[cell]
+
+    def rebuild(self, objects):
+        """Indexes every (key, obj) pair of objects from scratch."""
+        self.__points = {}
+        self.__cells = {}
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def within(self, south, west, north, east):
+        """Yields the keys inside the box, which crosses the antimeridian
+        when west > east."""
+        for keys in self.__overlapped(south, west, north, east):
+            for key in keys:
+                if in_box(*self.__points[key], south, west, north, east):
+                    yield key
+
+    def estimate(self, south, west, north, east):
+        """Returns how many keys lie in the cells the box overlaps, at
+        least as many as within() yields, without reading a point."""
+        return sum(len(keys) for keys in
+                   self.__overlapped(south, west, north, east))
+
+    def nearest(self, lat, lng, k=10, accept=None):
+        """Returns the k closest keys to the point as a list of
+        (distance in km, key) pairs, closest first, only counting the
+        keys for which accept(key) is true when accept is given."""
+        if k <= 0 or not self.__points:
+            return []
+        points = self.__points.items()
+        if accept is not None:
+            points = ((key, point) for key, point in points if accept(key))
+        row0, col0 = self.__cell_of(lat, lng)
+        best = []
+        seen = 0
+        ring = 0
+        while seen < len(self.__points):
+            if (2 * ring + 1) ** 2 > 4 * len(self.__cells):
+                return heapq.nsmallest(k, (
+                    (distance_km(lat, lng, *point), key)
+                    for key, point in points))
+            for row, col in self.__ring(row0, col0, ring):
+                for key in self.__cells.get((row, col), ()):
+                    seen += 1
+                    entry = (-distance_km(lat, lng, *self.__points[key]), key)
+                    if len(best) == k and entry <= best[0] or \
+                            accept is not None and not accept(key):
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    else:
+                        heapq.heapreplace(best, entry)
+            if len(best) == k and -best[0][0] <= self.__reach(lat, ring):
+                break
+            ring += 1
+        return sorted((-dist, key) for dist, key in best)
+
+    def __overlapped(self, south, west, north, east):
+        """Returns the key sets of the cells a box overlaps, or of every
+        cell when those are fewer."""
+        rows = range(self.__row(max(south, -90)),
+                     self.__row(min(north, 90)) + 1)
+        first, last = self.__column(west), self.__column(east)
+        if first > last or (first == last and west > east):
+            columns = list(range(first, self.__columns))
+            columns += range(0, last + 1)
+        else:
+            columns = range(first, last + 1)
+        if len(rows) * len(columns) > len(self.__cells):
+            return self.__cells.values()
+        return (self.__cells.get((row, col), ())
+                for row in rows for col in columns)
+
+    def __reach(self, lat, ring):
+        """Returns a distance in km that every point outside the first
+        ring + 1 rings of cells around a point at latitude lat is at least
+        as far as: the closest of the parallels and meridians bounding
+        those cells."""
+        span = math.radians(min(90.0, ring * self.cell))
+        across = math.asin(math.cos(math.radians(lat)) * math.sin(span))
+        return EARTH_RADIUS_KM * min(span, across)
+
+    def __ring(self, row0, col0, ring):
+        """Yields the cells at Chebyshev distance ring from a cell, with
+        columns wrapping around the antimeridian."""
+        if ring == 0:
+            yield row0, col0
+            return
+        width = min(2 * ring + 1, self.__columns)
+        for row in range(row0 - ring, row0 + ring + 1):
+            if row in (row0 - ring, row0 + ring):
+                offsets = range(-ring, -ring + width)
+            else:
+                offsets = {-ring, ring}
+            for offset in offsets:
+                yield row, (col0 + offset) % self.__columns
+
+    def __row(self, lat):
+        """Returns the cell row of a latitude."""
+        return math.floor((lat + 90) / self.cell)
+
+    def __column(self, lng):
+        """Returns the cell column of a longitude."""
+        return math.floor((lng + 180) / self.cell) % self.__columns
+
+    def __cell_of(self, lat, lng):
+        """Returns the (row, column) cell holding a point."""
+        return self.__row(lat), self.__column(lng)
+
+
+class TextIndex:
+    """Inverted index over the words of one or more text attributes.
+
+    Each word maps to the keys holding it and the positions it appears
+    at, so queries can require whole phrases. Results are ranked with
+    BM25 over all the words of the query.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, *attrs):
+        """Initializes an empty index over attrs."""
+        self.attrs = attrs
+        self.__postings = {}
+        self.__lengths = {}
+        self.__total = 0
+
+    def add(self, key, obj):
+        """Indexes the words of obj under key."""
+        position = 0
+        positions = {}
+        for attr in self.attrs:
+            value = getattr(obj, attr, None)
+            if not isinstance(value, str):
+                continue
+            for word in tokenize(value):
+                positions.setdefault(word, []).append(position)
+                position += 1
+            position += 1
+        if not positions:
+            return
+        for word, places in positions.items():
+            self.__postings.setdefault(word, {})[key] = places
+        self.__lengths[key] = (position, tuple(positions))
+        self.__total += position
+
+    def remove(self, key):
+        """Removes key from the index."""
+        if key not in self.__lengths:
+            return
+        length, words = self.__lengths.pop(key)
+        self.__total -= length
+        for word in words:
+            keys = self.__postings[word]
+            del keys[key]
+            if not keys:
+                del self.__postings[word]
+
+    def rebuild(self, objects):
+        """Indexes every (key, obj) pair of objects from scratch."""
+        self.__postings = {}
+        self.__lengths = {}
+        self.__total = 0
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def search(self, query, limit=None):
+        """Returns the (score, key) pairs of the keys holding every word
+        and every "quoted phrase" of query, best first, at most limit."""
+        phrases = [tokenize(text) for text in _phrase.findall(query)]
+        phrases = [words for words in phrases if words]
+        words = set(tokenize(_phrase.sub(" ", query)))
+        for phrase in phrases:
+            words.update(phrase)
+        if not words:
+            return []
+        postings = sorted((self.__postings.get(word, {}) for word in words),
+                          key=len)
+        keys = [key for key in postings[0]
+                if all(key in other for other in postings[1:])]
+        keys = [key for key in keys
+                if all(self.__has_phrase(key, phrase) for phrase in phrases)]
+        scored = ((self.__score(key, words), key) for key in keys)
+        if limit is None:
+            return sorted(scored, key=lambda pair: (-pair[0], pair[1]))
+        return heapq.nsmallest(limit, scored,
+                               key=lambda pair: (-pair[0], pair[1]))
+
+    def __has_phrase(self, key, phrase):
+        """Tells if the words of phrase follow each other in key."""
+        following = [set(self.__postings[word][key]) for word in phrase[1:]]
+        for start in self.__postings[phrase[0]][key]:
+            if all(start + i + 1 in places
+                   for i, places in enumerate(following)):
+                return True
+        return False
+
+    def __score(self, key, words):
+        """Returns the BM25 score of key for words."""
+        count = len(self.__lengths)
+        average = self.__total / count
+        length = self.__lengths[key][0]
+        score = 0.0
+        for word in words:
+            keys = self.__postings[word]
+            frequency = len(keys[key])
+            rarity = math.log(1 + (count - len(keys) + 0.5) /
+                              (len(keys) + 0.5))
+            score += rarity * frequency * (self.k1 + 1) / (
+                frequency + self.k1 * (1 - self.b + self.b * length / average))
+        return score
+
+
+def to_bitmap(ordinals):
+    """Returns the int with the bits of ordinals set, built in one pass."""
+    if not ordinals:
+        return 0
+    flags = bytearray(max(ordinals) // 8 + 1)
+    for i in ordinals:
+        flags[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(flags, "little")
+
+
+class Ordinals:
+    """Numbers the keys of one class densely from 0, reusing the numbers
+    of removed keys first, so the bitmap indexes of the class can share
+    one bit position per key and stay as short as the class is large."""
+    attrs = ()
+
+    def __init__(self):
+        """Initializes an empty numbering."""
+        self.__ordinals = {}
+        self.__keys = []
+        self.__free = []
+
+    def add(self, key, obj):
+        """Gives key an ordinal if it has none."""
+        if key in self.__ordinals:
+            return
+        if self.__free:
+            ordinal = heapq.heappop(self.__free)
+            self.__keys[ordinal] = key
+        else:
+            ordinal = len(self.__keys)
+            self.__keys.append(key)
+        self.__ordinals[key] = ordinal
+
+    def remove(self, key):
+        """Frees the ordinal of key."""
+        ordinal = self.__ordinals.pop(key, None)
+        if ordinal is not None:
+            self.__keys[ordinal] = None
+            heapq.heappush(self.__free, ordinal)
+
+    def rebuild(self, objects):
+        """Numbers the keys of objects from scratch."""
+        self.__keys = list(objects)
+        self.__ordinals = {key: i for i, key in enumerate(self.__keys)}
+        self.__free = []
+
+    def ordinal(self, key):
+        """Returns the ordinal of key, or None."""
+        return self.__ordinals.get(key)
+
+    def key(self, ordinal):
+        """Returns the key numbered ordinal, or None."""
+        return self.__keys[ordinal]
+
+    def __len__(self):
+        """Returns one more than the highest ordinal ever given out."""
+        return len(self.__keys)
+
+    def keys(self, bits):
+        """Yields the keys whose ordinal is set in the int bits, in
+        ordinal order."""
+        digits = bin(bits)[:1:-1]
+        i = digits.find("1")
+        while i != -1:
+            yield self.__keys[i]
+            i = digits.find("1", i + 1)
+
+
+class BitmapIndex:
+    """Maps each value of one attribute to a bitmap, a Python int with the
+    bit of each holding key's ordinal set.
+
+    A list, tuple or set attribute (like Place.amenity_ids) puts its key
+    under every element. Combining values is then a bitwise AND or OR
+    over ints instead of a test on every object. On a low-cardinality
+    numeric attribute (like Place.number_rooms) a range is the OR of the
+    few values inside it, and facets() counts keys per value.
+
+    `ordinals` must be set to the Ordinals of the class, which
+    FileStorage shares between all the bitmap indexes of a class so
+    their bitmaps can be combined. The shared Ordinals is then
+    maintained by its owner. In-place changes to a list attribute are
+    not seen: assign a new one.
+
+    Setting one bit copies the whole int, so add() only queues ordinals
+    and they are folded into the bitmaps in one pass at the next read.
+    """
+
+    def __init__(self, attr):
+        """Initializes an empty index over attr, numbering its keys by
+        itself until `ordinals` is replaced by a shared one."""
+        self.attr = attr
+        self.attrs = (attr,)
+        self.ordinals = self.__own = Ordinals()
+        self.__bits = {}
+        self.__pending = {}
+        self.__members = {}
+
+    def add(self, key, obj):
+        """Indexes obj under key."""
+        self.ordinals.add(key, obj)
+        ordinal = self.ordinals.ordinal(key)
+        values = self.__values(obj)
+        for value in values:
+            self.__pending.setdefault(value, set()).add(ordinal)
+        self.__members[key] = (ordinal, values)
+
+    def remove(self, key):
+        """Removes key from the index."""
+        if key not in self.__members:
+            return
+        ordinal, values = self.__members.pop(key)
+        for value in values:
+            pending = self.__pending.get(value, ())
+            if ordinal in pending:
+                pending.discard(ordinal)
+                continue
+            bits = self.__bits[value] & ~(1 << ordinal)
+            if bits:
+                self.__bits[value] = bits
+            else:
+                del self.__bits[value]
+        if self.ordinals is self.__own:
+            self.ordinals.remove(key)
+
+    def rebuild(self, objects):
+        """Indexes every (key, obj) pair of objects from scratch."""
+        self.__bits = {}
+        self.__pending = {}
+        self.__members = {}
+        if self.ordinals is self.__own:
+            self.ordinals.rebuild(objects)
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def bitmap(self, value):
+        """Returns the bitmap of the keys holding value."""
+        self.__fold()
+        try:
+            return self.__bits.get(value, 0)
+        except TypeError:
+            return 0
+
+    def all_of(self, values):
+        """Returns the bitmap of the keys holding every one of values."""
+        bits = None
+        for value in values:
+            bits = self.bitmap(value) if bits is None else \
+                bits & self.bitmap(value)
+            if not bits:
+                return 0
+        return -1 if bits is None else bits
+
+    def any_of(self, values):
+        """Returns the bitmap of the keys holding one of values."""
+        bits = 0
+        for value in values:
+            bits |= self.bitmap(value)
+        return bits
+
+    def between(self, low=None, high=None,
+                low_open=False, high_open=False):
+        """Returns the bitmap of the keys whose numeric value is between
+        low and high, included unless low_open or high_open and None
+        meaning unbounded."""
+        self.__fold()
+        bits = 0
+        for value, more in self.__bits.items():
+            value = as_number(value)
+            if value is None:
+                continue
+            if low is not None and (value < low or
+                                    low_open and value == low):
+                continue
+            if high is not None and (value > high or
+                                     high_open and value == high):
+                continue
+            bits |= more
+        return bits
+
+    def facets(self, bits=None):
+        """Returns a dictionary of how many keys hold each value, only
+        counting the keys set in bits when it is given."""
+        self.__fold()
+        if bits is None:
+            return {value: bit_count(more)
+                    for value, more in self.__bits.items()}
+        counts = {}
+        for value, more in self.__bits.items():
+            count = bit_count(more & bits)
+            if count:
+                counts[value] = count
+        return counts
+
+    def bitmap_of(self, keys):
+        """Returns the bitmap of keys, leaving out unindexed ones."""
+        ordinals = [self.ordinals.ordinal(key) for key in keys]
+        return to_bitmap([i for i in ordinals if i is not None])
+
+    def keys(self, bits):
+        """Yields the keys set in bits, or every indexed key for -1."""
+        if bits == -1:
+            return iter(list(self.__members))
+        return self.ordinals.keys(bits)
+
+    def bits(self, predicates):
+        """Returns (bitmap, covered predicates) for the predicates this
+        index answers (contains, all and any on a collection attribute,
+        eq, in and numeric comparisons on a plain one), or None when
+        none applies."""
+        bits = None
+        covered = []
+        for op, value in predicates:
+            try:
+                if op in ("contains", "eq"):
+                    found = self.all_of([value])
+                elif op == "all":
+                    found = self.all_of(set(value))
+                elif op in ("any", "in"):
+                    found = self.any_of(set(value))
+                elif op in ("lt", "lte") and as_number(value) is not None:
+                    found = self.between(high=value, high_open=op == "lt")
+                elif op in ("gt", "gte") and as_number(value) is not None:
+                    found = self.between(low=value, low_open=op == "gt")
+                else:
+                    continue
+            except TypeError:
+                continue
+            covered.append((op, value))
+            bits = found if bits is None else bits & found
+        if bits is None or bits == -1:
+            return None
+        return bits, covered
+
+    def plan(self, predicates):
+        """Returns (estimate, covered predicates, fetch) for the
+        predicates this index answers, or None. fetch() yields the
+        matching keys."""
+        found = self.bits(predicates)
+        if found is None:
+            return None
+        bits, covered = found
+        return (bit_count(bits), covered,
+                lambda reverse=False: self.keys(bits))
+
+    def __fold(self):
+        """Sets the bits of the ordinals queued by add()."""
+        for value, ordinals in self.__pending.items():
+            bits = self.__bits.get(value, 0) | to_bitmap(ordinals)
+            if bits:
+                self.__bits[value] = bits
+        self.__pending = {}
+
+    def __values(self, obj):
+        """Returns the hashable values obj is indexed under."""
+        value = getattr(obj, self.attr, None)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            values = value
+        else:
+            values = (value,)
+        found = set()
+        for value in values:
+            try:
+                hash(value)
+            except TypeError:
+                continue
+            found.add(value)
+        return tuple(found)
+
+
+class AggregateIndex:
+    """Keeps, for each value of one attribute, how many keys hold it and
+    the sums of some numeric attributes over those keys.
+
+    The totals are updated by add() and remove(), so reading one is a
+    dictionary lookup however many objects it covers. Values that are
+    not int or float count as 0 in the sums.
+    """
+
+    def __init__(self, attr, *summed):
+        """Initializes an empty index grouping by attr and summing the
+        attributes summed."""
+        self.attr = attr
+        self.summed = summed
+        self.attrs = (attr,) + summed
+        self.__members = {}
+        self.__groups = {}
+
+    def add(self, key, obj):
+        """Counts obj under key."""
+        group = getattr(obj, self.attr, None)
+        try:
+            totals = self.__groups.get(group)
+        except TypeError:
+            return
+        values = tuple(as_number(getattr(obj, attr, None)) or 0
+                       for attr in self.summed)
+        if totals is None:
+            totals = self.__groups[group] = [0] * (len(values) + 1)
+        totals[0] += 1
+        for i, value in enumerate(values, 1):
+            totals[i] += value
+        self.__members[key] = (group, values)
+
+    def remove(self, key):
+        """Removes key from the totals."""
+        if key not in self.__members:
+            return
+        group, values = self.__members.pop(key)
+        totals = self.__groups[group]
+        if totals[0] == 1:
+            del self.__groups[group]
+            return
+        totals[0] -= 1
+        for i, value in enumerate(values, 1):
+            totals[i] -= value
+
+    def rebuild(self, objects):
+        """Recomputes the totals of every (key, obj) pair of objects."""
+        self.__members = {}
+        self.__groups = {}
+        for key, obj in objects.items():
+            self.add(key, obj)
+
+    def count(self, value):
+        """Returns how many keys have an attribute equal to value."""
+        try:
+            totals = self.__groups.get(value)
+        except TypeError:
+            return 0
+        return 0 if totals is None else totals[0]
+
+    def total(self, attr, value):
+        """Returns the sum of attr over the keys whose attribute equals
+        value."""
+        try:
+            totals = self.__groups.get(value)
+        except TypeError:
+            return 0
+        return 0 if totals is None else totals[self.summed.index(attr) + 1]
+
+    def counts(self):
+        """Returns a dictionary of how many keys hold each value."""
+        return {group: totals[0] for group, totals in self.__groups.items()}
+
+    def distinct(self):
+        """Returns how many different values the keys hold."""
+        return len(self.__groups)
+
+    def top(self, k):
+        """Returns the k (value, count) pairs with the highest counts,
+        highest first and ties by value, through a bounded heap."""
+        return [(group, totals[0]) for group, totals in heapq.nsmallest(
+            k, self.__groups.items(),
+            key=lambda item: (-item[1][0], str(item[0])))]
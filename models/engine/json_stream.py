@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+Reads a top-level JSON object one entry at a time.
+Authors: YASSINE - ANAS
+"""
+import re
+import json
+
+CHUNK_SIZE = 1 << 16
+_decoder = json.JSONDecoder()
+_space = re.compile(r'[ \t\n\r]*')
+
+
+def iter_object(f, chunk_size=CHUNK_SIZE):
+    """Yields the (key, value) pairs of the JSON object in the text file f.
+
+    The file is read chunk by chunk and each value is decoded as soon as
+    it is complete, so only about one chunk of entries is held in memory
+    at a time. The entries of a chunk up to its last '}, "' are decoded
+    by one call when that text is a run of whole entries, which shares
+    the names repeated across entries as json.load() does; entries are
+    decoded one at a time otherwise.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    first = None
+    batch = True
+    while True:
+        if batch and first is not None:
+            batch = False
+            start = pos
+            if not first:
+                start = _space.match(buf, pos).end() + 1
+            cut = buf.rfind('}, "', start)
+            if cut >= start and (first or buf[start - 1] == ','):
+                try:
+                    entries = _decoder.decode("{" + buf[start:cut + 1] + "}")
+                except json.JSONDecodeError:
+                    entries = None
+                if entries is not None:
+                    yield from entries.items()
+                    first = False
+                    pos = cut + 1
+                    continue
+        try:
+            i = _space.match(buf, pos).end()
+            if first is None:
+                if buf[i] != '{':
+                    raise json.JSONDecodeError("Expecting '{'", buf, i)
+                first = True
+                pos = i + 1
+                continue
+            if buf[i] == '}':
+                return
+            if not first:
+                if buf[i] != ',':
+                    raise json.JSONDecodeError(
+                        "Expecting ',' delimiter", buf, i)
+                i = _space.match(buf, i + 1).end()
+            key, i = _decoder.raw_decode(buf, i)
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", buf, i)
+            i = _space.match(buf, i).end()
+            if buf[i] != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", buf, i)
+            value, i = _decoder.raw_decode(buf, _space.match(buf, i + 1).end())
+            if _space.match(buf, i).end() == len(buf):
+                raise IndexError("value may continue in the next chunk")
+        except (IndexError, json.JSONDecodeError):
+            if eof:
+                raise json.JSONDecodeError(
+                    "Unterminated object", buf, len(buf)) from None
+            chunk = f.read(max(chunk_size, len(buf) - pos))
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            batch = True
+            continue
+        first = False
+        pos = i
+        yield key, value
+
+
+def write_object(f, entries, chunk_size=CHUNK_SIZE):
+    """Writes a JSON object to the text file f from (key, text) pairs,
+    where text is the already encoded JSON value of key.
+
+    Entries are buffered into chunks of about chunk_size characters, so
+    the object is never assembled in memory as a whole.
+    """
+    parts = ["{"]
+    size = 1
+    sep = ""
+    for key, text in entries:
+        part = "{}{}: {}".format(sep, json.dumps(key), text)
+        parts.append(part)
+        size += len(part)
+        sep = ", "
+        if size >= chunk_size:
+            f.write("".join(parts))
+            parts = []
+            size = 0
+    parts.append("}")
+    f.write("".join(parts))
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""
+Answers the listing search over Place: where, price, guests, amenities,
+sorted by price or distance, one page at a time.
+Authors: YASSINE - ANAS
+"""
+import heapq
+import math
+from models.engine.indexes import GridIndex, as_number, distance_km, in_box
+from models.engine.query import Query, _Desc, _kind, _matches
+
+ORDERS = ("price", "-price", "distance")
+
+
+def _point(obj):
+    """Returns the (latitude, longitude) of obj, or None."""
+    lat = as_number(getattr(obj, "latitude", None))
+    lng = as_number(getattr(obj, "longitude", None))
+    if lat is None or lng is None:
+        return None
+    return lat, lng
+
+
+def search_places(storage, city_id=None, box=None, price_min=None,
+                  price_max=None, guests=None, amenities=(), order="price",
+                  near=None, offset=0, limit=20):
+    """Returns an ordered dictionary of one page of the places matching
+    every criterion given.
+
+    city_id picks one city and box a (south, west, north, east)
+    viewport; price_min and price_max bound price_by_night, guests is
+    the least max_guest and amenities the ids a place must all have.
+    order is "price", "-price" or "distance" from near, a (lat, lng)
+    defaulting to the center of box. Ties go by key, descending for
+    "-price", and places without a numeric price or a location come
+    last.
+
+    The attribute criteria go through the Query planner, which drives
+    them from the most selective index or the AND of the bitmap indexes;
+    a viewport whose grid cells hold fewer places than a walk in order
+    is expected to read, about sqrt((offset + limit) * places) or more
+    when the filters are selective, drives from the grid index instead.
+    A bigger one is checked on each place while walking the places in
+    order, from the sorted price index or the rings of the grid index
+    around near, stopping at the end of the page unless the filters
+    match so few places that ranking them all is cheaper.
+    """
+    if order not in ORDERS:
+        raise ValueError("unknown order: {}".format(order))
+    if order == "distance" and near is None:
+        if box is None:
+            raise ValueError("distance order needs near or box")
+        near = _center(*box)
+    filters = {}
+    if city_id is not None:
+        filters["city_id"] = city_id
+    if price_min is not None:
+        filters["price_by_night__gte"] = price_min
+    if price_max is not None:
+        filters["price_by_night__lte"] = price_max
+    if guests is not None:
+        filters["max_guest__gte"] = guests
+    if amenities:
+        filters["amenity_ids__all"] = list(amenities)
+    query = Query(storage, "Place").filter(**filters)
+    objects, indexes = storage.indexes_for("Place")
+    grid = next((index for index in indexes
+                 if isinstance(index, GridIndex)), None)
+    wanted = offset + limit
+    rank = _by_distance(near) if order == "distance" else \
+        _by_price(order == "-price")
+    if box is None and order != "distance":
+        return _by_query(query, order, offset, limit)
+    if box is None and grid is not None and not filters:
+        return _page(_nearest(objects, grid, near, wanted), offset, limit)
+    predicates = _predicates(filters)
+    walk = math.sqrt(wanted * len(objects))
+    estimate = None
+    if box is not None and grid is not None:
+        held = grid.estimate(*box)
+        if held > walk and filters:
+            estimate = query.explain()["estimate"]
+            walk *= math.sqrt(len(objects) / max(estimate, 1))
+    if box is not None and grid is not None and held <= walk:
+        candidates = [(key, objects[key]) for key in grid.within(*box)
+                      if all(_matches(objects[key], *predicate)
+                             for predicate in predicates)]
+        return _page(heapq.nsmallest(wanted, candidates, key=rank),
+                     offset, limit)
+    if order != "distance":
+        return _by_query(query.where(_inside(box)), order, offset, limit)
+    if estimate is None:
+        estimate = query.explain()["estimate"]
+    if box is not None and grid is not None and \
+            estimate ** 2 > wanted * len(objects):
+        inside = _inside(box)
+        found = grid.nearest(*near, wanted, lambda key: inside(
+            objects[key]) and all(_matches(objects[key], *predicate)
+                                  for predicate in predicates))
+        return _page([(key, objects[key]) for distance, key in found],
+                     offset, limit)
+    candidates = list(query.all().items())
+    if box is not None:
+        inside = _inside(box)
+        candidates = [(key, obj) for key, obj in candidates if inside(obj)]
+    return _page(heapq.nsmallest(wanted, candidates, key=rank),
+                 offset, limit)
+
+
+def _by_query(query, order, offset, limit):
+    """Returns the page of query ordered by price_by_night, which the
+    planner can read from the sorted index and stop at the end of the
+    page."""
+    query.order_by("price_by_night" if order == "price"
+                   else "-price_by_night")
+    return query.offset(offset).limit(limit).all()
+
+
+def _inside(box):
+    """Returns a function telling if a place lies inside box, True for
+    every place when box is None."""
+    if box is None:
+        return lambda obj: True
+
+    def inside(obj):
+        point = _point(obj)
+        return point is not None and in_box(*point, *box)
+    return inside
+
+
+def _predicates(filters):
+    """Returns the (attr, op, value) predicates of query filters."""
+    found = []
+    for name, value in filters.items():
+        attr, _, op = name.partition("__")
+        found.append((attr, op or "eq", value))
+    return found
+
+
+def _center(south, west, north, east):
+    """Returns the center of a box, which crosses the antimeridian when
+    west > east."""
+    if west > east:
+        east += 360
+    lng = (west + east) / 2
+    return (south + north) / 2, lng - 360 if lng > 180 else lng
+
+
+def _by_price(reverse):
+    """Returns the sort key of (key, obj) pairs by price_by_night, in
+    the order of Query.order_by()."""
+    def rank(item):
+        value = getattr(item[1], "price_by_night", None)
+        kind = _kind(value)
+        entry = (repr(value) if kind == 2 else value, item[0])
+        return (kind, _Desc(entry) if reverse else entry)
+    return rank
+
+
+def _by_distance(near):
+    """Returns the sort key of (key, obj) pairs by distance to near."""
+    def rank(item):
+        point = _point(item[1])
+        if point is None:
+            return (1, 0, item[0])
+        return (0, distance_km(*near, *point), item[0])
+    return rank
+
+
+def _nearest(objects, grid, near, wanted):
+    """Returns the wanted (key, obj) pairs closest to near through the
+    grid index, then the places without a location."""
+    found = [(key, objects[key]) for distance, key in
+             grid.nearest(near[0], near[1], wanted)]
+    if len(found) < wanted:
+        rest = [(key, obj) for key, obj in objects.items()
+                if _point(obj) is None]
+        found += sorted(rest)[:wanted - len(found)]
+    return found
+
+
+def _page(items, offset, limit):
+    """Returns the dictionary of items[offset:offset + limit]."""
+    return {key: obj for key, obj in items[offset:offset + limit]}
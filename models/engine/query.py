@@ -0,0 +1,335 @@
+#!/usr/bin/python3
+"""
+Defines the Query class returned by FileStorage.query().
+Authors: YASSINE - ANAS
+"""
+import heapq
+from models.engine.indexes import as_number, bit_count
+
+
+def _matches(obj, attr, op, value):
+    """Tells if the attribute attr of obj satisfies the predicate op value.
+    Comparisons only hold between numbers."""
+    current = getattr(obj, attr, None)
+    try:
+        if op == "eq":
+            return current == value
+        if op == "in":
+            return current in value
+        if op in ("contains", "all", "any"):
+            if not isinstance(current, (list, tuple, set, frozenset)):
+                return False
+            if op == "contains":
+                return value in current
+            if op == "all":
+                return all(v in current for v in value)
+            return any(v in current for v in value)
+    except TypeError:
+        return False
+    current, value = as_number(current), as_number(value)
+    if current is None or value is None:
+        return False
+    if op == "lt":
+        return current < value
+    if op == "lte":
+        return current <= value
+    if op == "gt":
+        return current > value
+    return current >= value
+
+
+def _kind(value):
+    """Returns the rank of the type of value in orderings: numbers, then
+    strings, then everything else."""
+    if as_number(value) is not None:
+        return 0
+    return 1 if isinstance(value, str) else 2
+
+
+class _Desc:
+    """Wraps an item so a heap keeps the largest items on top."""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        """Wraps item."""
+        self.item = item
+
+    def __lt__(self, other):
+        """Compares the wrapped items the other way around."""
+        return other.item < self.item
+
+
+class Query:
+    """Selects objects of one class by attribute predicates.
+
+    Filters are keyword arguments `attr=value` or `attr__op=value` with op
+    one of eq, lt, lte, gt, gte and in, or contains, all and any on a
+    collection attribute, all of which must hold, and where() adds
+    functions of the object that must hold too. The planner drives the
+    query from the index whose estimate is smallest, or from the AND of
+    every bitmap index answering a predicate, checks the other
+    predicates on each object, and reads an ordered index instead of
+    sorting when it can. With a limit, it also walks the ordered index
+    and stops early when the driver matches so many objects that the
+    first page should come quickly in order: when the expected walk,
+    (offset + limit) * size / driver estimate, is shorter than the
+    driver. explain() reports that plan.
+    """
+    operators = ("eq", "lt", "lte", "gt", "gte", "in",
+                 "contains", "all", "any")
+
+    def __init__(self, storage, cls):
+        """Initializes a query over the objects of cls in storage."""
+        self.__storage = storage
+        self.__cls = cls if isinstance(cls, str) else cls.__name__
+        self.__filters = []
+        self.__checks = []
+        self.__order = None
+        self.__limit = None
+        self.__offset = 0
+
+    def filter(self, **filters):
+        """Adds predicates to the query and returns it."""
+        for name, value in filters.items():
+            attr, _, op = name.partition("__")
+            op = op or "eq"
+            if op not in Query.operators:
+                raise ValueError("unknown operator: {}".format(name))
+            self.__filters.append((attr, op, value))
+        return self
+
+    def where(self, check):
+        """Adds a function of the object that must return true for it to
+        match, which no index answers, and returns the query."""
+        self.__checks.append(check)
+        return self
+
+    def order_by(self, attr):
+        """Orders the results by attr, descending if it starts with '-',
+        and returns the query. Numbers come before strings and other
+        values in either direction."""
+        self.__order = (attr.lstrip("-"), attr.startswith("-"))
+        return self
+
+    def limit(self, count):
+        """Keeps at most count results and returns the query."""
+        self.__limit = count
+        return self
+
+    def offset(self, count):
+        """Skips the first count results and returns the query."""
+        self.__offset = count
+        return self
+
+    def all(self):
+        """Returns a dictionary of the matching objects, in order."""
+        objects, plan = self.__plan()
+        keys = self.__ordered(objects, plan)
+        stop = None if self.__limit is None else self.__offset + self.__limit
+        found = {}
+        for i, key in enumerate(keys):
+            if stop is not None and i >= stop:
+                break
+            if i >= self.__offset:
+                found[key] = objects[key]
+        return found
+
+    def first(self):
+        """Returns the first matching object, or None."""
+        limit = self.__limit
+        self.__limit = 1
+        try:
+            return next(iter(self.all().values()), None)
+        finally:
+            self.__limit = limit
+
+    def count(self):
+        """Returns how many objects match, ignoring limit and offset."""
+        objects, plan = self.__plan()
+        if plan["index"] is not None and not plan["filters"] and \
+                not self.__checks:
+            return plan["estimate"]
+        return sum(1 for key in self.__matching(objects, plan))
+
+    def explain(self):
+        """Returns a dictionary describing how the query would run: the
+        driving index (None for a full scan) with its estimate and the
+        predicates it answers, the predicates checked on each object,
+        and whether the order comes from an index or a sort."""
+        objects, plan = self.__plan()
+        return {
+            "class": self.__cls,
+            "index": plan["index"],
+            "estimate": plan["estimate"],
+            "covered": plan["covered"],
+            "filters": plan["filters"],
+            "order": plan["order"],
+            "offset": self.__offset,
+            "limit": self.__limit,
+        }
+
+    def __plan(self):
+        """Returns the objects of the class and the plan of the query."""
+        objects, indexes = self.__storage.indexes_for(self.__cls)
+        by_attr = {}
+        for attr, op, value in self.__filters:
+            by_attr.setdefault(attr, []).append((op, value))
+        best = None
+        ordered_by = None
+        options = [self.__bitmaps(indexes, by_attr)]
+        for index in indexes:
+            if not hasattr(index, "plan") or len(index.attrs) != 1:
+                continue
+            attr = index.attrs[0]
+            option = index.plan(by_attr.get(attr, []))
+            if option is not None:
+                options.append((
+                    option[0], [(attr, op, v) for op, v in option[1]],
+                    option[2], "{}({})".format(type(index).__name__, attr),
+                    attr if getattr(index, "ordered", False) else None))
+        for option in options:
+            if option is not None and (best is None or option[0] < best[0]):
+                best = option
+        plan = {"index": None, "estimate": len(objects), "covered": [],
+                "fetch": None, "order": None, "tail": False}
+        if best is not None:
+            plan.update(index=best[3], estimate=best[0], fetch=best[2],
+                        covered=best[1])
+            ordered_by = best[4]
+        if self.__order is not None:
+            attr = self.__order[0]
+            if best is not None and ordered_by == attr:
+                plan["order"] = "index"
+            else:
+                plan["order"] = "sort"
+                wanted = None
+                if self.__limit is not None:
+                    wanted = self.__offset + self.__limit
+                for index in indexes:
+                    if getattr(index, "ordered", False) and \
+                            index.attrs == (attr,) and \
+                            (best is None or wanted is not None and
+                             wanted * len(objects) < best[0] ** 2):
+                        plan.update(
+                            index="{}({})".format(type(index).__name__, attr),
+                            estimate=len(objects), covered=[],
+                            fetch=lambda reverse, i=index: i.range(
+                                reverse=reverse),
+                            order="index", tail=True)
+                        option = index.plan(by_attr.get(attr, []))
+                        if option is not None:
+                            plan.update(
+                                estimate=option[0], fetch=option[2],
+                                covered=[(attr, op, v) for op, v in option[1]],
+                                tail=False)
+                        break
+        plan["filters"] = [f for f in self.__filters
+                           if f not in plan["covered"]]
+        return objects, plan
+
+    @staticmethod
+    def __bitmaps(indexes, by_attr):
+        """Returns the option of driving the query from the AND of the
+        bitmaps of every bitmap index answering a predicate, or None
+        when fewer than two of them sharing their ordinals do."""
+        found = []
+        for index in indexes:
+            if hasattr(index, "bits") and len(index.attrs) == 1 and \
+                    (not found or index.ordinals is found[0][0].ordinals):
+                bits = index.bits(by_attr.get(index.attrs[0], []))
+                if bits is not None:
+                    found.append((index,) + bits)
+        if len(found) < 2:
+            return None
+        bits = found[0][1]
+        covered = []
+        for index, more, preds in found:
+            bits &= more
+            covered += [(index.attrs[0], op, v) for op, v in preds]
+        label = "&".join("{}({})".format(type(index).__name__,
+                                         index.attrs[0])
+                         for index, more, preds in found)
+        keys = found[0][0].keys
+        return (bit_count(bits), covered,
+                lambda reverse=False: keys(bits), label, None)
+
+    def __matching(self, objects, plan):
+        """Yields the keys matching every predicate, in the order of the
+        driving index."""
+        reverse = self.__order is not None and self.__order[1]
+        if plan["fetch"] is None:
+            keys = objects
+        elif plan["order"] == "index":
+            keys = plan["fetch"](reverse)
+        else:
+            keys = plan["fetch"]()
+        filters = plan["filters"]
+        checks = self.__checks
+        for key in keys:
+            obj = objects[key]
+            if all(_matches(obj, *f) for f in filters) and \
+                    all(check(obj) for check in checks):
+                yield key
+        if plan["tail"]:
+            attr = self.__order[0]
+            rest = [(key, objects[key]) for key in objects
+                    if _kind(getattr(objects[key], attr, None))]
+            for key, obj in self.__sort(rest, attr, reverse):
+                if all(_matches(obj, *f) for f in filters) and \
+                        all(check(obj) for check in checks):
+                    yield key
+
+    def __ordered(self, objects, plan):
+        """Returns the matching keys in the order of the query, keeping
+        only the first offset + limit in bounded heaps when limited."""
+        keys = self.__matching(objects, plan)
+        if plan["order"] != "sort":
+            return keys
+        attr, reverse = self.__order
+        found = ((key, objects[key]) for key in keys)
+        if self.__limit is not None:
+            return self.__top(found, attr, reverse,
+                              self.__offset + self.__limit)
+        return [key for key, obj in self.__sort(found, attr, reverse)]
+
+    @staticmethod
+    def __top(items, attr, reverse, count):
+        """Returns the keys of the first count (key, obj) pairs in the
+        order of __sort, holding at most count pairs per kind of value."""
+        if count <= 0:
+            return []
+        heaps = ([], [], [])
+        for key, obj in items:
+            value = getattr(obj, attr, None)
+            kind = _kind(value)
+            item = (repr(value) if kind == 2 else value, key)
+            entry = item if reverse else _Desc(item)
+            heap = heaps[kind]
+            if len(heap) < count:
+                heapq.heappush(heap, entry)
+            elif heap[0] < entry:
+                heapq.heapreplace(heap, entry)
+        keys = []
+        for heap in heaps:
+            group = heap if reverse else [entry.item for entry in heap]
+            keys.extend(key for value, key in sorted(group, reverse=reverse))
+        return keys[:count]
+
+    @staticmethod
+    def __sort(items, attr, reverse):
+        """Sorts (key, obj) pairs by attr then key, keeping numbers before
+        strings before other values in either direction."""
+        kinds = ([], [], [])
+        for key, obj in items:
+            value = getattr(obj, attr, None)
+            kinds[_kind(value)].append((key, obj, value))
+        ordered = []
+        for kind, group in enumerate(kinds):
+            if kind == 2:
+                group.sort(key=lambda item: (repr(item[2]), item[0]),
+                           reverse=reverse)
+            else:
+                group.sort(key=lambda item: (item[2], item[0]),
+                           reverse=reverse)
+            ordered.extend((key, obj) for key, obj, value in group)
+        return ordered
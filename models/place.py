@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Defines the Place class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class Place(BaseModel):
     """Represents a Place."""
     city_id = ""
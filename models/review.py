@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Defines the Review class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class Review(BaseModel):
     """Represents a Review."""
     place_id = ""
@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Defines the State class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class State(BaseModel):
     """Represents a State."""
     name = ""
@@ -1,8 +1,9 @@
 #!/usr/bin/python3
 """Module for User class."""
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class User(BaseModel):
     """Class representing a User."""
     email = ""
@@ -9,6 +9,7 @@ import subprocess
 import unittest
 from models import storage
 from models.engine.file_storage import FileStorage
+from models.place import Place
 from console import HBNBCommand
 from io import StringIO
 from unittest.mock import patch
@@ -94,7 +95,8 @@ class TestHBNBCommand_help(unittest.TestCase):
         """Tests 'help'."""
         h = ("Documented commands (type help <topic>):\n"
              "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+             "EOF  all  count  create  destroy  help  quit  search  show  "
+             "top  update")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(h, output.getvalue().strip())
@@ -710,6 +712,29 @@ class TestHBNBCommand_destroy(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd(command))
             self.assertNotIn(obj, storage.all())
 
+    def test_destroy_cascade_and_restrict(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            state_id = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create City")
+            city_id = output.getvalue().strip()
+        HBNBCommand().onecmd(f'update City {city_id} state_id "{state_id}"')
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd(f"destroy State {state_id} restrict")
+            self.assertEqual("** instance has dependents **",
+                             output.getvalue().strip())
+            HBNBCommand().onecmd(f"destroy State {state_id} sometimes")
+            self.assertEqual("** unknown delete policy **",
+                             output.getvalue().strip().splitlines()[-1])
+        self.assertIsNotNone(storage.get("State", state_id))
+        with patch("sys.stdout", new=StringIO()) as output:
+            command = f'State.destroy("{state_id}", "cascade")'
+            self.assertFalse(HBNBCommand().onecmd(command))
+            self.assertEqual("", output.getvalue().strip())
+        self.assertIsNone(storage.get("State", state_id))
+        self.assertIsNone(storage.get("City", city_id))
+
 
 class TestHBNBCommand_all(unittest.TestCase):
     """Tests displaying all objects."""
@@ -1024,13 +1049,27 @@ class TestHBNBCommand_update(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd(testCmd))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_update_private_attr_ignored(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            testId = output.getvalue().strip()
+        HBNBCommand().onecmd('update Place {} _key "oops"'.format(testId))
+        HBNBCommand().onecmd(
+            "update Place {} {{'_extra': 1, 'name': 'Loft'}}".format(testId))
+        obj = storage.all()["Place.{}".format(testId)]
+        self.assertEqual("Loft", obj.name)
+        self.assertNotIn("_extra", obj.to_dict())
+        self.assertNotIn("oops", str(obj))
+        HBNBCommand().onecmd("destroy Place {}".format(testId))
+        self.assertNotIn("Place.{}".format(testId), storage.all())
+
     def test_update_valid_string_attr_space_notation(self):
         with patch("sys.stdout", new=StringIO()) as output:
             HBNBCommand().onecmd("create BaseModel")
             testId = output.getvalue().strip()
         testCmd = "update BaseModel {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["BaseModel.{}".format(testId)].__dict__
+        test_dict = storage.all()["BaseModel.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1038,7 +1077,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update User {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["User.{}".format(testId)].__dict__
+        test_dict = storage.all()["User.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1046,7 +1085,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update State {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["State.{}".format(testId)].__dict__
+        test_dict = storage.all()["State.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1054,7 +1093,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update City {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["City.{}".format(testId)].__dict__
+        test_dict = storage.all()["City.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1062,7 +1101,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update Place {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["Place.{}".format(testId)].__dict__
+        test_dict = storage.all()["Place.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1070,7 +1109,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update Amenity {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["Amenity.{}".format(testId)].__dict__
+        test_dict = storage.all()["Amenity.{}".format(testId)].to_dict()
         self.assertEqual("attr_value", test_dict["attr_name"])
 
         with patch("sys.stdout", new=StringIO()) as output:
@@ -1078,7 +1117,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update Review {} attr_name 'attr_value'".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["Review.{}".format(testId)].__dict__
+        test_dict = storage.all()["Review.{}".format(testId)].to_dict()
         self.assertTrue("attr_value", test_dict["attr_name"])
 
     def test_update_valid_float_attr_space_notation(self):
@@ -1087,7 +1126,7 @@ class TestHBNBCommand_update(unittest.TestCase):
             testId = output.getvalue().strip()
         testCmd = "update Place {} latitude 7.2".format(testId)
         self.assertFalse(HBNBCommand().onecmd(testCmd))
-        test_dict = storage.all()["Place.{}".format(testId)].__dict__
+        test_dict = storage.all()["Place.{}".format(testId)].to_dict()
         self.assertEqual(7.2, test_dict["latitude"])
 
 
@@ -1156,5 +1195,145 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_search(unittest.TestCase):
+    """Tests full-text search."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_search_missing_class(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search"))
+            self.assertEqual("** class name missing **",
+                             output.getvalue().strip())
+
+    def test_search_invalid_class(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search MyModel view"))
+            self.assertEqual("** class doesn't exist **",
+                             output.getvalue().strip())
+
+    def test_search_missing_query(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search Review"))
+            self.assertEqual("** query missing **",
+                             output.getvalue().strip())
+
+    def test_search_class_without_text_index(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search User Betty"))
+            self.assertEqual("** no text index for class **",
+                             output.getvalue().strip())
+
+    def test_search_unsupported_storage(self):
+        with patch.object(console, "storage", object()):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("search Review view"))
+                self.assertEqual("** not supported by this storage **",
+                                 output.getvalue().strip())
+
+    def test_search_space_notation(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create Review"))
+            testID = output.getvalue().strip()
+        HBNBCommand().onecmd(
+            f'update Review {testID} text "Great ocean view, quiet"')
+        obj = storage.all()["Review.{}".format(testID)]
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(
+                HBNBCommand().onecmd('search Review "ocean view" quiet'))
+            self.assertEqual(str([str(obj)]), output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(
+                HBNBCommand().onecmd('search Review "view ocean"'))
+            self.assertEqual("[]", output.getvalue().strip())
+
+    def test_search_dot_notation(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create Place"))
+            testID = output.getvalue().strip()
+        HBNBCommand().onecmd(f'update Place {testID} name "Loft"')
+        obj = storage.all()["Place.{}".format(testID)]
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd('Place.search("loft")'))
+            self.assertEqual(str([str(obj)]), output.getvalue().strip())
+
+
+class TestHBNBCommand_top(unittest.TestCase):
+    """Tests top-k listing."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_top_errors(self):
+        cases = [("top", "** class name missing **"),
+                 ("top MyModel price", "** class doesn't exist **"),
+                 ("top Place", "** attribute name missing **"),
+                 ("Place.top()", "** attribute name missing **"),
+                 ("top Place price_by_night many", "** invalid count **"),
+                 ("top Place name 0", "** invalid count **"),
+                 ('Place.top("name", 0)', "** invalid count **")]
+        for command, expected in cases:
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(expected, output.getvalue().strip())
+        with patch.object(console, "storage", object()):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd("top Place name 3"))
+                self.assertEqual("** not supported by this storage **",
+                                 output.getvalue().strip())
+
+    def test_top(self):
+        places = []
+        for price in (30, 10, 20):
+            pl = Place()
+            pl.price_by_night = price
+            places.append(pl)
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(
+                HBNBCommand().onecmd("top Place price_by_night 2"))
+            self.assertEqual(str([str(places[1]), str(places[2])]),
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(
+                HBNBCommand().onecmd('Place.top("-price_by_night", 1)'))
+            self.assertEqual(str([str(places[0])]),
+                             output.getvalue().strip())
+
+
 if __name__ == "__main__":
     unittest.main()
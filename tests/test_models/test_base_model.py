@@ -1,11 +1,15 @@
 #!/usr/bin/python3
 """Simplified unit tests for BaseModel class."""
 import os
+import json
 import models
 import unittest
+import tracemalloc
 from datetime import datetime
 from time import sleep
-from models.base_model import BaseModel
+from models.base_model import BaseModel, COMPACT, slotted
+from models.base_model import decode_time, encode_time, hydrator, to_epoch
+from models.place import Place
 
 
 class TestBaseModel_instantiation(unittest.TestCase):
@@ -55,6 +59,7 @@ class TestBaseModel_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, bmstr)
         self.assertIn("'updated_at': " + dt_repr, bmstr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         bm = BaseModel(None)
         self.assertNotIn(None, bm.__dict__.values())
@@ -172,6 +177,7 @@ class TestBaseModel_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(bm.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         bm = BaseModel()
         self.assertNotEqual(bm.to_dict(), bm.__dict__)
@@ -181,6 +187,159 @@ class TestBaseModel_to_dict(unittest.TestCase):
         with self.assertRaises(TypeError):
             bm.to_dict(None)
 
+    def test_to_dict_epoch(self):
+        dt = datetime(2024, 2, 29, 23, 59, 59, 999999)
+        bm = BaseModel()
+        bm.created_at = bm.updated_at = dt
+        bm_dict = bm.to_dict(epoch=True)
+        self.assertEqual(1709251199999999, bm_dict["created_at"])
+        self.assertEqual(bm_dict["created_at"], bm_dict["updated_at"])
+        copy = BaseModel(**bm_dict)
+        self.assertEqual(dt, copy.created_at)
+        self.assertEqual(bm.to_dict(), copy.to_dict())
+
+
+class TestBaseModel_timestamps(unittest.TestCase):
+    """Tests for the timestamp codec."""
+
+    def test_round_trip(self):
+        for dt in (datetime(1970, 1, 1), datetime(1969, 7, 20, 20, 17, 40),
+                   datetime(2038, 1, 19, 3, 14, 8, 1), datetime.now()):
+            self.assertEqual(dt, decode_time(encode_time(dt, True)))
+            self.assertEqual(dt, decode_time(encode_time(dt)))
+            self.assertEqual(dt.isoformat(),
+                             encode_time(encode_time(dt, True)))
+        self.assertEqual(-1, to_epoch(datetime(1969, 12, 31, 23, 59, 59,
+                                               999999)))
+
+    def test_bad_values(self):
+        with self.assertRaises(TypeError):
+            decode_time(None)
+        with self.assertRaises(ValueError):
+            decode_time("yesterday")
+
+
+class TestBaseModel_hydrator(unittest.TestCase):
+    """Tests that hydrator() builds what the kwargs constructor does."""
+
+    def setUp(self):
+        pl = Place()
+        pl.city_id = "".join(["c", "1"])
+        pl.amenity_ids = ["".join(["a", "1"]), 5]
+        pl.nickname = "loft"
+        self.values = pl.to_dict()
+
+    def test_same_as_kwargs(self):
+        for values in (self.values, dict(self.values, updated_at=1)):
+            built = hydrator(Place)(values)
+            plain = Place(**values)
+            self.assertEqual(Place, type(built))
+            self.assertEqual(plain.to_dict(), built.to_dict())
+            self.assertEqual(str(plain), str(built))
+            self.assertIs(plain.city_id, built.city_id)
+            self.assertIs(plain.amenity_ids[0], built.amenity_ids[0])
+        self.assertIn("__class__", self.values)
+
+    def test_bad_timestamp(self):
+        with self.assertRaises(TypeError):
+            hydrator(Place)(dict(self.values, created_at=None))
+
+    def test_own_init_is_called(self):
+        class Custom(Place):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.custom = True
+
+        self.assertTrue(hydrator(Custom)(self.values).custom)
+
+
+@unittest.skipIf(COMPACT, "the models are already slotted")
+class TestBaseModel_slotted(unittest.TestCase):
+    """Tests for the compact models built by slotted()."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.Base = slotted(BaseModel)
+        cls.Place = slotted(Place, (cls.Base,))
+
+    def setUp(self):
+        dt = datetime.today().isoformat()
+        self.kwargs = {"id": "123456", "created_at": dt, "updated_at": dt,
+                       "__class__": "Place", "city_id": "c1",
+                       "price_by_night": 80, "amenity_ids": ["a1"]}
+
+    def test_same_name_and_no_dict(self):
+        pl = self.Place(**self.kwargs)
+        self.assertEqual("Place", type(pl).__name__)
+        self.assertTrue(issubclass(self.Place, self.Base))
+        self.assertFalse(hasattr(pl, "__dict__"))
+
+    def test_defaults_and_extra_attributes(self):
+        pl = self.Place(**self.kwargs)
+        self.assertEqual("", pl.name)
+        self.assertEqual(0, pl.max_guest)
+        pl.nickname = "loft"
+        pl.name = "Loft"
+        self.assertEqual("loft", pl.nickname)
+        self.assertEqual({"nickname": "loft"}, pl._extra)
+        with self.assertRaises(AttributeError):
+            pl.rating
+
+    def test_to_dict_and_str_match_plain_models(self):
+        plain = Place(**self.kwargs)
+        pl = self.Place(**self.kwargs)
+        plain.nickname = pl.nickname = "loft"
+        self.assertEqual(plain.to_dict(), pl.to_dict())
+        self.assertNotIn("name", pl.to_dict())
+        self.assertEqual(str(plain), str(pl))
+        self.assertEqual(plain.to_dict(epoch=True), pl.to_dict(epoch=True))
+
+    def test_timestamps_stored_as_epoch(self):
+        pl = self.Place(**self.kwargs)
+        self.assertEqual(int, type(pl._created_at))
+        self.assertEqual(self.kwargs["created_at"], pl.created_at.isoformat())
+        dt = datetime(2020, 1, 1, 12)
+        pl.updated_at = dt
+        self.assertEqual(to_epoch(dt), pl._updated_at)
+        self.assertEqual(dt, pl.updated_at)
+        copy = self.Place(**pl.to_dict(epoch=True))
+        self.assertEqual(pl._updated_at, copy._updated_at)
+        with self.assertRaises(TypeError):
+            self.Place(created_at=None)
+
+    def test_hydrator(self):
+        pl = self.Place(**self.kwargs)
+        pl.nickname = "loft"
+        built = hydrator(self.Place)(pl.to_dict())
+        self.assertEqual(pl.to_dict(), built.to_dict())
+        self.assertEqual("Place.123456", built._key)
+        self.assertEqual({"nickname": "loft"}, built._extra)
+        self.assertIs(built._created_at, built._updated_at)
+
+    def test_memory(self):
+        texts, stamp = [], self.kwargs["created_at"]
+        for i in range(2000):
+            pl = Place(id="{:06}".format(i), created_at=stamp,
+                       updated_at=stamp, city_id="c{}".format(i % 10),
+                       user_id="u{}".format(i % 50), name="Place {}".format(i),
+                       description="Nice", number_rooms=2, max_guest=4,
+                       number_bathrooms=1, price_by_night=100 + i,
+                       latitude=1.5, longitude=2.5, amenity_ids=["a1"])
+            pl.updated_at = pl.updated_at.replace(microsecond=i % 2)
+            texts.append(json.dumps(pl.to_dict()))
+
+        def size(cls):
+            build = hydrator(cls)
+            tracemalloc.start()
+            objects = [build(json.loads(text)) for text in texts]
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return used
+
+        # Reloaded Places with their values are only about 1.2 times
+        # smaller on CPython 3.11+, short of the 2 times first aimed at.
+        self.assertLess(size(self.Place) * 1.15, size(Place))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -10,6 +10,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.base_model import COMPACT
 from models.city import City
 
 
@@ -31,12 +32,14 @@ class TestCity_instantiation(unittest.TestCase):
     def test_updated_at_is_public_datetime(self):
         self.assertEqual(datetime, type(City().updated_at))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_state_id_is_public_class_attribute(self):
         cy = City()
         self.assertEqual(str, type(City.state_id))
         self.assertIn("state_id", dir(cy))
         self.assertNotIn("state_id", cy.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_name_is_public_class_attribute(self):
         cy = City()
         self.assertEqual(str, type(City.name))
@@ -72,6 +75,7 @@ class TestCity_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, cystr)
         self.assertIn("'updated_at': " + dt_repr, cystr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         cy = City(None)
         self.assertNotIn(None, cy.__dict__.values())
@@ -180,6 +184,7 @@ class TestCity_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(cy.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         cy = City()
         self.assertNotEqual(cy.to_dict(), cy.__dict__)
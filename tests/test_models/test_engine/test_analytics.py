@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+"""Unittests for analytics.py."""
+
+import random
+import models
+import statistics
+import unittest
+from unittest.mock import patch
+from models.engine import analytics
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+class TestAnalytics_without_numpy(unittest.TestCase):
+    """Tests the reports refuse to run without numpy."""
+
+    def test_import_error(self):
+        with patch.object(analytics, "numpy", None):
+            with self.assertRaises(ImportError):
+                analytics.percentiles(models.storage, Place,
+                                      "price_by_night")
+
+
+@unittest.skipIf(analytics.numpy is None, "numpy is not installed")
+class TestAnalytics(unittest.TestCase):
+    """Tests the numpy reports against plain Python."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        rng = random.Random(5)
+        self.places = []
+        for i in range(300):
+            pl = Place()
+            pl.city_id = "c{}".format(i % 7)
+            pl.price_by_night = rng.randint(10, 500)
+            self.places.append(pl)
+        self.places[0].price_by_night = "ask"
+        self.places[1].city_id = None
+        for i in range(100):
+            Review().user_id = "u{}".format(rng.randint(0, 30))
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def by_city(self):
+        groups = {}
+        for pl in self.places:
+            if isinstance(pl.city_id, str) and \
+                    isinstance(pl.price_by_night, int):
+                groups.setdefault(pl.city_id, []).append(pl.price_by_night)
+        return groups
+
+    def test_group_by(self):
+        groups = self.by_city()
+        means = analytics.group_by(models.storage, Place, "city_id",
+                                   "price_by_night", "mean")
+        self.assertEqual(set(groups), set(means))
+        for city, prices in groups.items():
+            self.assertAlmostEqual(statistics.mean(prices), means[city])
+        self.assertEqual(
+            {city: max(prices) for city, prices in groups.items()},
+            analytics.group_by(models.storage, Place, "city_id",
+                               "price_by_night", "max"))
+        self.assertEqual(
+            {city: min(prices) for city, prices in groups.items()},
+            analytics.group_by(models.storage, Place, "city_id",
+                               "price_by_night", "min"))
+        counts = analytics.group_by(models.storage, Place, "city_id")
+        self.assertEqual(299, sum(counts.values()))
+        with self.assertRaises(ValueError):
+            analytics.group_by(models.storage, Place, "city_id", how="sum")
+        with self.assertRaises(ValueError):
+            analytics.group_by(models.storage, Place, "city_id",
+                               "price_by_night", "median")
+
+    def test_percentiles_and_histogram(self):
+        prices = sorted(pl.price_by_night for pl in self.places[1:])
+        found = analytics.percentiles(models.storage, Place,
+                                      "price_by_night", (0, 50, 100))
+        self.assertEqual((prices[0], statistics.median(prices), prices[-1]),
+                         (found[0], found[50], found[100]))
+        counts, edges = analytics.histogram(models.storage, Place,
+                                            "price_by_night", 4, (0, 600))
+        self.assertEqual([0, 150, 300, 450, 600], edges)
+        self.assertEqual([sum(1 for p in prices if low <= p < low + 150)
+                          for low in (0, 150, 300, 450)], counts)
+        self.assertEqual({50: None},
+                         analytics.percentiles(models.storage, Place,
+                                               "rank", (50,)))
+
+    def test_group_sizes(self):
+        reviews = {}
+        for rv in models.storage.all(Review).values():
+            reviews[rv.user_id] = reviews.get(rv.user_id, 0) + 1
+        sizes = {}
+        for count in reviews.values():
+            sizes[count] = sizes.get(count, 0) + 1
+        self.assertEqual(sizes, analytics.group_sizes(models.storage,
+                                                      Review, "user_id"))
+
+    def test_table_cached_until_change(self):
+        first = analytics.table(models.storage, Place, ("price_by_night",))
+        self.assertIs(first, analytics.table(models.storage, Place,
+                                             ("price_by_night",)))
+        self.places[5].price_by_night = 1
+        second = analytics.table(models.storage, Place, ("price_by_night",))
+        self.assertIsNot(first, second)
+        self.assertEqual(1, analytics.numpy.nanmin(
+            second.numbers["price_by_night"]))
+        Review()
+        self.assertIs(second, analytics.table(models.storage, Place,
+                                              ("price_by_night",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""Unittests for columns.py."""
+
+import random
+import models
+import unittest
+from unittest.mock import patch
+from models.engine import columns
+from models.engine.columns import ColumnStore
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class Obj:
+    """Plain object carrying arbitrary attributes."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestColumnStore(unittest.TestCase):
+    """Tests the columnar store without numpy."""
+    numpy = None
+
+    def setUp(self):
+        self.patch = patch.object(columns, "numpy", self.numpy)
+        self.patch.start()
+        rng = random.Random(3)
+        self.objects = {}
+        for i in range(200):
+            self.objects["k{}".format(i)] = Obj(
+                price=rng.choice([rng.randint(10, 90), rng.random(), "n/a"]),
+                city=rng.choice(["c1", "c2", "c3", None]))
+        self.store = ColumnStore(("price",), ("city",))
+        self.store.rebuild(self.objects)
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def expected(self, keep):
+        return sorted(key for key, obj in self.objects.items() if keep(obj))
+
+    def number(self, obj):
+        return obj.price if type(obj.price) in (int, float) else None
+
+    def test_attrs_and_columns(self):
+        self.assertEqual(("price", "city"), self.store.attrs)
+        self.assertEqual("d", self.store.column("price").typecode)
+        self.assertEqual(200, len(self.store.column("city")))
+        self.assertEqual(200, len(self.store))
+
+    def test_rows(self):
+        rows = self.store.rows(price__gte=20, price__lt=50, city="c2")
+        self.assertEqual(self.expected(
+            lambda obj: self.number(obj) is not None and
+            20 <= obj.price < 50 and obj.city == "c2"),
+            sorted(self.store.keys(rows)))
+        rows = self.store.rows(city__in=["c1", "c3", 4], price__in=[10, 11])
+        self.assertEqual(self.expected(
+            lambda obj: obj.city in ("c1", "c3") and
+            self.number(obj) in (10, 11)), sorted(self.store.keys(rows)))
+        self.assertEqual([], self.store.rows(city="c9"))
+        self.assertEqual([], self.store.rows(city__lt="c2"))
+        self.assertEqual([], self.store.rows(price="n/a"))
+        with self.assertRaises(ValueError):
+            self.store.rows(price__near=3)
+        with self.assertRaises(KeyError):
+            self.store.rows(rank=3)
+
+    def test_aggregates(self):
+        numbers = [self.number(obj) for obj in self.objects.values()
+                   if self.number(obj) is not None]
+        self.assertAlmostEqual(sum(numbers), self.store.sum("price"))
+        self.assertAlmostEqual(sum(numbers) / len(numbers),
+                               self.store.mean("price"))
+        rows = self.store.rows(city="c1")
+        self.assertEqual(len(rows), self.store.count(city="c1"))
+        counts = {}
+        for obj in self.objects.values():
+            counts[obj.city] = counts.get(obj.city, 0) + 1
+        self.assertEqual(counts, self.store.group_count("city"))
+        self.assertEqual({"c1": len(rows)},
+                         self.store.group_count("city", rows))
+        self.assertIsNone(self.store.mean("price", []))
+
+    def test_add_and_remove_reuse_rows(self):
+        self.store.remove("k5")
+        self.store.remove("k5")
+        self.assertEqual(199, len(self.store))
+        self.store.add("new", Obj(price=1000, city="c9"))
+        self.assertEqual(200, len(self.store.column("price")))
+        self.assertEqual(["new"], self.store.keys(
+            self.store.rows(price__gt=999)))
+        self.assertEqual(["new"], self.store.keys(self.store.rows(city="c9")))
+
+    def test_column_is_a_copy(self):
+        column = self.store.column("price")
+        view = memoryview(column)
+        self.store.add("new", Obj(price=1000, city="c9"))
+        self.assertEqual(200, len(view))
+        self.assertEqual(201, len(self.store.column("price")))
+        self.assertEqual(["new"], self.store.keys(
+            self.store.rows(price__gt=999)))
+
+
+@unittest.skipIf(columns.numpy is None, "numpy is not installed")
+class TestColumnStore_numpy(TestColumnStore):
+    """Tests the columnar store with numpy."""
+    numpy = columns.numpy
+
+
+class TestFileStorage_columns(unittest.TestCase):
+    """Tests the columnar mirror kept by FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_built_lazily_and_kept_in_sync(self):
+        pl = Place()
+        pl.price_by_night = 80
+        self.assertIsNone(models.storage.columns("User"))
+        store = models.storage.columns(Place)
+        self.assertIs(store, models.storage.columns("Place"))
+        self.assertEqual(["Place." + pl.id],
+                         store.keys(store.rows(price_by_night=80)))
+        pl.price_by_night = 90
+        pl.city_id = "c1"
+        other = Place()
+        other.city_id = "c1"
+        self.assertEqual(["Place." + pl.id],
+                         store.keys(store.rows(price_by_night__gt=85)))
+        self.assertEqual(2, store.count(city_id="c1"))
+        models.storage.delete(pl)
+        self.assertEqual(0, store.count(price_by_night__gt=85))
+        self.assertEqual(1, len(store))
+
+    def test_kept_when_objects_are_replaced(self):
+        store = models.storage.columns(Place)
+        FileStorage._FileStorage__objects = {}
+        for i in range(3):
+            Place().price_by_night = 10 * i
+        self.assertEqual(3, len(store))
+        self.assertEqual(2, store.count(price_by_night__gte=10))
+        self.assertIs(store, models.storage.columns(Place))
+
+
+if __name__ == "__main__":
+    unittest.main()
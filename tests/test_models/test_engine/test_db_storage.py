@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+"""Unittests for db_storage.py."""
+
+import os
+import models
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.engine.db_storage import DBStorage
+from models.user import User
+from models.state import State
+from models.place import Place
+from models.city import City
+
+
+class TestDBStorage(unittest.TestCase):
+    """Tests the SQLite storage engine."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with patch.dict(os.environ, {"HBNB_DB_PATH": self.path}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.patch = patch.object(models, "storage", self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.storage.close()
+        os.remove(self.path)
+
+    def reopen(self):
+        self.storage.reload()
+
+    def test_one_table_per_class(self):
+        db = sqlite3.connect(self.path)
+        tables = {row[0] for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        db.close()
+        self.assertEqual(set(DBStorage.classes), tables)
+
+    def test_new_is_visible_before_save(self):
+        us = User()
+        self.assertIs(us, self.storage.all(User)["User." + us.id])
+        self.assertIs(us, self.storage.get("User", us.id))
+
+    def test_save_and_reload(self):
+        us = User()
+        us.email = "a@b.com"
+        st = State()
+        self.storage.save()
+        self.reopen()
+        loaded = self.storage.get(User, us.id)
+        self.assertIsNot(us, loaded)
+        self.assertEqual("a@b.com", loaded.email)
+        self.assertEqual(us.created_at, loaded.created_at)
+        self.assertEqual({"State." + st.id}, set(self.storage.all("State")))
+        self.assertEqual(2, len(self.storage.all()))
+
+    def test_update_is_an_upsert(self):
+        us = User()
+        self.storage.save()
+        us.first_name = "Betty"
+        us.save()
+        self.reopen()
+        self.assertEqual("Betty", self.storage.get(User, us.id).first_name)
+        self.assertEqual(1, len(self.storage.all(User)))
+
+    def test_delete(self):
+        us = User()
+        self.storage.save()
+        self.storage.delete(us)
+        self.assertIsNone(self.storage.get(User, us.id))
+        self.assertEqual({}, self.storage.all(User))
+        self.storage.save()
+        self.reopen()
+        self.assertIsNone(self.storage.get(User, us.id))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.storage.get(Place, "nope"))
+        self.assertIsNone(self.storage.get("MyModel", "nope"))
+
+    def test_identity_is_kept(self):
+        pl = Place()
+        self.storage.save()
+        self.reopen()
+        first = self.storage.get(Place, pl.id)
+        self.assertIs(first, self.storage.all(Place)["Place." + pl.id])
+
+    def test_unsaved_changes_are_dropped_on_reload(self):
+        us = User()
+        self.reopen()
+        self.assertIsNone(self.storage.get(User, us.id))
+
+    def test_count(self):
+        users = [User() for _ in range(3)]
+        State()
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(3, self.storage.count(User))
+        self.assertEqual(4, self.storage.count())
+        User()
+        self.storage.delete(self.storage.get(User, users[0].id))
+        self.storage.get(User, users[1].id).first_name = "Betty"
+        self.assertEqual(3, self.storage.count("User"))
+        self.assertEqual(0, self.storage.count("MyModel"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+    def test_children_and_cascade(self):
+        st = State()
+        ct = City()
+        ct.state_id = st.id
+        pl = Place()
+        pl.city_id = ct.id
+        self.storage.save()
+        self.reopen()
+        st = self.storage.get(State, st.id)
+        self.assertEqual({"City." + ct.id},
+                         set(self.storage.children(st)))
+        with self.assertRaises(ValueError):
+            self.storage.delete(st, "restrict")
+        self.storage.delete(st, "cascade")
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(0, self.storage.count())
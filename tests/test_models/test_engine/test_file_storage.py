@@ -5,9 +5,13 @@ import os
 import json
 import models
 import unittest
+import shutil
+import sys
 import subprocess
+import tempfile
+from unittest.mock import patch
 from datetime import datetime
-from models.base_model import BaseModel
+from models.base_model import BaseModel, COMPACT, slotted
 from models.engine.file_storage import FileStorage
 from models.user import User
 from models.state import State
@@ -15,6 +19,7 @@ from models.place import Place
 from models.city import City
 from models.amenity import Amenity
 from models.review import Review
+from console import HBNBCommand
 
 
 class TestCodeStyle(unittest.TestCase):
@@ -90,10 +95,20 @@ class TestFileStorage_methods(unittest.TestCase):
         """'all' should return a dict."""
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
-        """'all' doesn't take args."""
+    def test_all_with_args(self):
+        """'all' takes at most a class."""
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(None, None)
+
+    def test_all_with_cls(self):
+        """'all' with a class only returns objects of that class."""
+        bm = BaseModel()
+        us = User()
+        for cls in (User, "User"):
+            users = models.storage.all(cls)
+            self.assertEqual(dict, type(users))
+            self.assertIn("User." + us.id, users)
+            self.assertNotIn("BaseModel." + bm.id, users)
 
     def test_new(self):
         """'new' should add objects."""
@@ -184,5 +199,804 @@ class TestFileStorage_methods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Tests the append-only journal mode."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        models.storage.journal = True
+
+    def tearDown(self):
+        models.storage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_first_save_writes_checkpoint(self):
+        bm = BaseModel()
+        bm.save()
+        self.assertTrue(os.path.exists("file.json"))
+        self.assertFalse(os.path.exists("file.json.journal"))
+
+    def test_save_appends_only_changed_objects(self):
+        bm = BaseModel()
+        us = User()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            checkpoint = f.read()
+        us.first_name = "Betty"
+        us.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(checkpoint, f.read())
+        with open("file.json.journal", "r") as f:
+            lines = f.readlines()
+        self.assertEqual(1, len(lines))
+        self.assertIn("User." + us.id, lines[0])
+        self.assertNotIn(bm.id, lines[0])
+
+    def test_reload_replays_journal(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        us.first_name = "Betty"
+        us.save()
+        models.storage.delete(st)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual("Betty", objs["User." + us.id].first_name)
+        self.assertNotIn("State." + st.id, objs)
+
+    def test_reload_drops_torn_record(self):
+        us = User()
+        models.storage.save()
+        us.save()
+        with open("file.json.journal", "a") as f:
+            f.write('{"op": "set", "key": "User.x", "da')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + us.id, models.storage.all())
+        self.assertNotIn("User.x", models.storage.all())
+        with open("file.json.journal", "r") as f:
+            self.assertTrue(f.read().endswith("\n"))
+
+    def test_checkpoint_after_limit(self):
+        models.storage.journal_limit = 1
+        try:
+            us = User()
+            models.storage.save()
+            us.save()
+            us.save()
+            self.assertFalse(os.path.exists("file.json.journal"))
+        finally:
+            del models.storage.journal_limit
+
+
+class TestFileStorage_dirty_tracking(unittest.TestCase):
+    """Tests that saves only re-encode changed objects."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        models.storage.cache_encoded = True
+
+    def tearDown(self):
+        del models.storage.cache_encoded
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_setattr_marks_dirty(self):
+        us = User()
+        models.storage.save()
+        self.assertEqual(set(), FileStorage._FileStorage__dirty)
+        us.first_name = "Betty"
+        self.assertEqual({"User." + us.id}, FileStorage._FileStorage__dirty)
+
+    def test_reload_builds_without_setattr(self):
+        us = User()
+        us.first_name = "Betty"
+        models.storage.save()
+        with patch.object(FileStorage, "mark_dirty") as mark_dirty:
+            models.storage.reload()
+        mark_dirty.assert_not_called()
+        self.assertEqual(set(), FileStorage._FileStorage__dirty)
+        self.assertEqual(us.to_dict(),
+                         models.storage.all()["User." + us.id].to_dict())
+
+    @unittest.skipIf(COMPACT, "the models keep their key in _key")
+    def test_key_attribute_of_plain_model_is_data(self):
+        us = User()
+        models.storage.save()
+        us._key = "oops"
+        self.assertEqual({"User." + us.id}, FileStorage._FileStorage__dirty)
+        models.storage.delete(us)
+        self.assertNotIn("User." + us.id, models.storage.all())
+
+    def test_unstored_object_is_not_dirty(self):
+        us = User()
+        models.storage.save()
+        models.storage.delete(us)
+        models.storage.save()
+        us.first_name = "Betty"
+        self.assertEqual(set(), FileStorage._FileStorage__dirty)
+
+    def test_save_reencodes_only_dirty(self):
+        users = [User() for _ in range(3)]
+        models.storage.save()
+        with patch.object(User, "to_dict", autospec=True,
+                          side_effect=User.to_dict) as to_dict:
+            users[1].first_name = "Betty"
+            models.storage.save()
+            self.assertEqual(1, to_dict.call_count)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(3, len(saved))
+        self.assertEqual("Betty", saved["User." + users[1].id]["first_name"])
+
+    def test_save_sees_lists_changed_in_place(self):
+        pl = Place()
+        pl.amenity_ids = ["a"]
+        models.storage.save()
+        pl.amenity_ids.append("b")
+        User()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(["a", "b"], saved["Place." + pl.id]["amenity_ids"])
+
+    def test_save_recreates_missing_file(self):
+        us = User()
+        models.storage.save()
+        os.remove("file.json")
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertIn("User." + us.id, json.load(f))
+
+    def test_save_without_encoded_cache(self):
+        models.storage.cache_encoded = False
+        us = User()
+        models.storage.save()
+        self.assertNotIn(id(us), FileStorage._FileStorage__encoded)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + us.id, json.load(f))
+
+    def test_encoded_cache_off_by_default(self):
+        self.assertFalse(FileStorage.cache_encoded)
+
+    def test_save_reuses_text_of_unchanged_lists(self):
+        pl = Place()
+        pl.amenity_ids = ["a"]
+        nested = Place()
+        nested.rules = {"pets": ["cat"]}
+        models.storage.save()
+        self.assertIn(id(pl), FileStorage._FileStorage__encoded)
+        self.assertNotIn(id(nested), FileStorage._FileStorage__encoded)
+        with patch.object(Place, "to_dict", autospec=True,
+                          side_effect=Place.to_dict) as to_dict:
+            User()
+            models.storage.save()
+            self.assertEqual(1, to_dict.call_count)
+            pl.amenity_ids.append("b")
+            User()
+            models.storage.save()
+            self.assertEqual(3, to_dict.call_count)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(["a", "b"], saved["Place." + pl.id]["amenity_ids"])
+
+    def test_save_epoch_timestamps(self):
+        us = User()
+        us.save()
+        models.storage.epoch_timestamps = True
+        try:
+            pl = Place()
+            models.storage.save()
+            with open("file.json", "r") as f:
+                saved = json.load(f)
+        finally:
+            del models.storage.epoch_timestamps
+        self.assertEqual(str, type(saved["User." + us.id]["created_at"]))
+        self.assertEqual(int, type(saved["Place." + pl.id]["updated_at"]))
+        models.storage.reload()
+        objects = models.storage.all()
+        self.assertEqual(pl.updated_at, objects["Place." + pl.id].updated_at)
+        self.assertEqual(us.created_at, objects["User." + us.id].created_at)
+
+
+class TestFileStorage_sharded(unittest.TestCase):
+    """Tests the one-file-per-class layout."""
+
+    def setUp(self):
+        self.shard_dir = tempfile.mkdtemp()
+        models.storage._FileStorage__shard_dir = self.shard_dir
+        models.storage.sharded = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        del models.storage.sharded
+        del models.storage._FileStorage__shard_dir
+        shutil.rmtree(self.shard_dir)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__loaded = set()
+
+    def shard(self, name):
+        return os.path.join(self.shard_dir, name + ".json")
+
+    def test_save_writes_one_file_per_class(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        with open(self.shard("User"), "r") as f:
+            self.assertEqual(["User." + us.id], list(json.load(f)))
+        with open(self.shard("State"), "r") as f:
+            self.assertEqual(["State." + st.id], list(json.load(f)))
+        self.assertFalse(os.path.exists(self.shard("Review")))
+
+    def test_save_rewrites_only_changed_shards(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        os.remove(self.shard("User"))
+        st.name = "California"
+        models.storage.save()
+        self.assertFalse(os.path.exists(self.shard("User")))
+        self.assertTrue(os.path.exists(self.shard("State")))
+
+    def test_reload_is_lazy(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(["State." + st.id], list(models.storage.all(State)))
+        self.assertNotIn("User." + us.id, FileStorage._FileStorage__objects)
+        self.assertIn("User." + us.id, models.storage.all())
+
+    def test_save_keeps_unread_objects(self):
+        first = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        second = State()
+        models.storage.save()
+        with open(self.shard("State"), "r") as f:
+            saved = json.load(f)
+        self.assertIn("State." + first.id, saved)
+        self.assertIn("State." + second.id, saved)
+
+    def test_journaled_shards(self):
+        models.storage.journal = True
+        try:
+            us = User()
+            models.storage.save()
+            us.first_name = "Betty"
+            us.save()
+            self.assertTrue(os.path.exists(self.shard("User") + ".journal"))
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            users = models.storage.all("User")
+            self.assertEqual("Betty", users["User." + us.id].first_name)
+        finally:
+            del models.storage.journal
+
+    def test_checkpoint_leaves_unread_shards(self):
+        us = User()
+        st = State()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(1, models.storage.count("State"))
+        models.storage.checkpoint()
+        self.assertEqual({"State"}, FileStorage._FileStorage__loaded)
+        self.assertTrue(os.path.exists(self.shard("User")))
+        models.storage.all()
+        self.assertIn("User." + us.id, models.storage.all())
+        self.assertIn("State." + st.id, models.storage.all())
+
+    def test_checkpoint_converts_unsharded_objects(self):
+        us = User()
+        FileStorage._FileStorage__loaded = set()
+        models.storage.checkpoint()
+        with open(self.shard("User"), "r") as f:
+            self.assertIn("User." + us.id, json.load(f))
+
+
+class TestFileStorage_class_index(unittest.TestCase):
+    """Tests the per-class index behind all(cls) and count()."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_count(self):
+        users = [User() for _ in range(3)]
+        State()
+        self.assertEqual(3, models.storage.count(User))
+        self.assertEqual(3, models.storage.count("User"))
+        self.assertEqual(0, models.storage.count("Review"))
+        self.assertEqual(4, models.storage.count())
+        models.storage.delete(users[0])
+        self.assertEqual(2, models.storage.count(User))
+
+    def test_all_cls_returns_a_copy(self):
+        us = User()
+        users = models.storage.all(User)
+        users.clear()
+        self.assertIn("User." + us.id, models.storage.all(User))
+
+    def test_index_follows_replaced_objects(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual({}, models.storage.all(User))
+        self.assertEqual(0, models.storage.count(User))
+        us = User()
+        self.assertEqual(["User." + us.id], list(models.storage.all(User)))
+
+    def test_reload_indexes_objects(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        try:
+            us = User()
+            models.storage.save()
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            self.assertEqual(1, models.storage.count(User))
+            self.assertIn("User." + us.id, models.storage.all(User))
+        finally:
+            os.remove("file.json")
+            try:
+                os.rename("tmp", "file.json")
+            except IOError:
+                pass
+
+    def test_indexes_built_per_class(self):
+        us = User()
+        us.email = "betty@example.com"
+        rv = Review()
+        rv.user_id = us.id
+        FileStorage._FileStorage__objects = dict(
+            FileStorage._FileStorage__objects)
+        self.assertEqual(0, models.storage.count(State))
+        built = FileStorage._FileStorage__indexes
+        self.assertNotIn("User", built)
+        self.assertNotIn("Review", built)
+        self.assertEqual({"User." + us.id: us}, models.storage.lookup(
+            User, "email", "betty@example.com"))
+        self.assertIn("User", built)
+        self.assertNotIn("Review", built)
+        rv.user_id = "other"
+        self.assertEqual({}, models.storage.lookup(Review, "user_id", us.id))
+
+    def test_text_index_built_by_first_search(self):
+        rv = Review()
+        rv.text = "quiet ocean view"
+        models.storage.lookup(Review, "place_id", "p1")
+
+        def text_indexes():
+            return [index for index in
+                    FileStorage._FileStorage__indexes["Review"]
+                    if type(index).__name__ == "TextIndex"]
+        self.assertEqual([], text_indexes())
+        self.assertEqual(["Review." + rv.id],
+                         list(models.storage.search(Review, "ocean")))
+        self.assertEqual(1, len(text_indexes()))
+        other = Review()
+        other.text = "ocean breeze"
+        self.assertEqual(2, len(models.storage.search("Review", "ocean")))
+        self.assertEqual(1, len(text_indexes()))
+
+
+class TestFileStorage_lookup(unittest.TestCase):
+    """Tests attribute lookups through the declared hash indexes."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_lookup_follows_setattr(self):
+        pl = Place()
+        self.assertEqual({}, models.storage.lookup(Place, "city_id", "c1"))
+        pl.city_id = "c1"
+        self.assertEqual({"Place." + pl.id: pl},
+                         models.storage.lookup(Place, "city_id", "c1"))
+        pl.city_id = "c2"
+        self.assertEqual({}, models.storage.lookup("Place", "city_id", "c1"))
+        self.assertIn("Place." + pl.id,
+                      models.storage.lookup("Place", "city_id", "c2"))
+
+    def test_lookup_follows_console_update(self):
+        us = User()
+        HBNBCommand().onecmd(f'update User {us.id} email "a@b.com"')
+        self.assertEqual({"User." + us.id: us},
+                         models.storage.lookup(User, "email", "a@b.com"))
+
+    def test_lookup_follows_delete(self):
+        rv = Review()
+        rv.place_id = "p1"
+        models.storage.delete(rv)
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p1"))
+
+    def test_lookup_after_reload(self):
+        cy = City()
+        cy.state_id = "s1"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.lookup(City, "state_id", "s1")
+        self.assertEqual(["City." + cy.id], list(found))
+        self.assertIsNot(cy, found["City." + cy.id])
+
+    def test_lookup_without_index_scans(self):
+        st = State()
+        st.name = "California"
+        self.assertEqual({"State." + st.id: st},
+                         models.storage.lookup(State, "name", "California"))
+
+    def test_range_follows_updates(self):
+        cheap = Place()
+        mid = Place()
+        dear = Place()
+        cheap.price_by_night = 40
+        mid.price_by_night = 80
+        dear.price_by_night = 200
+        found = models.storage.range(Place, "price_by_night", 50, 120)
+        self.assertEqual([mid], list(found.values()))
+        cheap.price_by_night = 100
+        found = models.storage.range("Place", "price_by_night", 50, 120)
+        self.assertEqual([mid, cheap], list(found.values()))
+        found = models.storage.range(Place, "price_by_night", reverse=True)
+        self.assertEqual([dear, cheap, mid], list(found.values())[:3])
+        models.storage.delete(mid)
+        found = models.storage.range(Place, "price_by_night", 50, 120)
+        self.assertEqual([cheap], list(found.values()))
+
+    def test_range_after_reload(self):
+        pl = Place()
+        pl.max_guest = 4
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        found = models.storage.range(Place, "max_guest", 3, 6)
+        self.assertEqual(["Place." + pl.id], list(found))
+
+    def test_within_and_nearest(self):
+        paris = Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        london = Place()
+        london.latitude, london.longitude = 51.5074, -0.1278
+        nowhere = Place()
+        nowhere.latitude = "unknown"
+        found = models.storage.within(Place, 48, 2, 49, 3)
+        self.assertEqual([paris], list(found.values()))
+        found = models.storage.nearest(Place, 51.0, 0.0, 2)
+        self.assertEqual([london, paris], list(found.values()))
+        paris.longitude = 2.5
+        self.assertIn("Place." + paris.id,
+                      models.storage.within("Place", 48, 2.4, 49, 2.6))
+        models.storage.delete(paris)
+        self.assertEqual({}, models.storage.within(Place, 48, 2, 49, 3))
+
+    def test_nearest_without_index_scans(self):
+        st = State()
+        st.latitude, st.longitude = 1.0, 1.0
+        State().latitude = "north"
+        self.assertEqual([st],
+                         list(models.storage.nearest(State, 0, 0).values()))
+        found = models.storage.within(State, 0, 0, 2, 2)
+        self.assertEqual([st], list(found.values()))
+
+    def test_range_without_index_scans(self):
+        pl = Place()
+        pl.latitude = 37.7
+        Place().latitude = "north"
+        found = models.storage.range(Place, "latitude", 37, 38)
+        self.assertEqual([pl], list(found.values()))
+
+
+class TestFileStorage_relations(unittest.TestCase):
+    """Tests reverse relationships and cascade or restrict deletes."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def graph(self):
+        st = State()
+        ct = City()
+        ct.state_id = st.id
+        us = User()
+        pl = Place()
+        pl.city_id = ct.id
+        pl.user_id = us.id
+        rv = Review()
+        rv.place_id = pl.id
+        rv.user_id = us.id
+        return st, ct, us, pl, rv
+
+    def test_children(self):
+        st, ct, us, pl, rv = self.graph()
+        self.assertEqual({"City." + ct.id: ct}, models.storage.children(st))
+        self.assertEqual({"Place." + pl.id: pl,
+                          "Review." + rv.id: rv},
+                         models.storage.children(us))
+        self.assertEqual({}, models.storage.children(rv))
+
+    def test_delete_default_leaves_children(self):
+        st, ct, us, pl, rv = self.graph()
+        models.storage.delete(st)
+        self.assertEqual(4, models.storage.count())
+
+    def test_delete_cascade(self):
+        st, ct, us, pl, rv = self.graph()
+        other = City()
+        models.storage.delete(st, "cascade")
+        self.assertEqual({"User." + us.id, "City." + other.id},
+                         set(models.storage.all()))
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual({"User." + us.id, "City." + other.id},
+                         set(models.storage.all()))
+
+    def test_delete_cascade_does_not_scan(self):
+        st, ct, us, pl, rv = self.graph()
+        with patch.object(FileStorage, "all", side_effect=AssertionError):
+            models.storage.delete(st, "cascade")
+        self.assertEqual(1, models.storage.count())
+
+    def test_delete_restrict(self):
+        st, ct, us, pl, rv = self.graph()
+        with self.assertRaises(ValueError):
+            models.storage.delete(st, "restrict")
+        self.assertEqual(5, models.storage.count())
+        models.storage.delete(rv, "restrict")
+        self.assertEqual(4, models.storage.count())
+
+
+class TestFileStorage_aggregates(unittest.TestCase):
+    """Tests the counts and sums kept by the aggregate indexes."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_tally_follows_changes(self):
+        pl = Place()
+        rv1, rv2 = Review(), Review()
+        rv1.place_id = rv2.place_id = pl.id
+        rv1.user_id = "u1"
+        rv2.user_id = "u2"
+        self.assertEqual(2, models.storage.tally(Review, "place_id", pl.id))
+        rv2.place_id = "other"
+        self.assertEqual(1, models.storage.tally("Review", "place_id", pl.id))
+        models.storage.delete(rv1)
+        self.assertEqual(0, models.storage.tally(Review, "place_id", pl.id))
+        self.assertEqual(1, models.storage.distinct(Review, "user_id"))
+
+    def test_sum_and_tallies(self):
+        for price in (10, 20, 30):
+            pl = Place()
+            pl.city_id = "c1"
+            pl.price_by_night = price
+        self.assertEqual(60, models.storage.tally(Place, "city_id", "c1",
+                                                  "price_by_night"))
+        self.assertEqual({"c1": 3}, models.storage.tallies(Place, "city_id"))
+        st = State()
+        for i in range(4):
+            City().state_id = st.id
+        self.assertEqual({st.id: 4}, models.storage.tallies(City,
+                                                            "state_id"))
+
+    def test_top_tallies(self):
+        for place_id, reviews in (("p1", 2), ("p2", 5), ("p3", 2), ("p4", 1)):
+            for i in range(reviews):
+                Review().place_id = place_id
+        self.assertEqual({"p2": 5, "p1": 2, "p3": 2},
+                         models.storage.top_tallies(Review, "place_id", 3))
+        self.assertEqual([("p2", 5), ("p1", 2)], list(
+            models.storage.top_tallies(Review, "place_id", 2).items()))
+        Amenity().name = "wifi"
+        self.assertEqual({"wifi": 1},
+                         models.storage.top_tallies(Amenity, "name", 1))
+
+    def test_without_aggregate_index(self):
+        Amenity().name = "wifi"
+        Amenity().name = "wifi"
+        self.assertEqual(2, models.storage.tally(Amenity, "name", "wifi"))
+        self.assertEqual({"wifi": 2}, models.storage.tallies("Amenity",
+                                                             "name"))
+        self.assertEqual(1, models.storage.distinct(Amenity, "name"))
+        self.assertEqual(0, models.storage.tally(Amenity, "name", "wifi",
+                                                 "rank"))
+
+    def test_recomputed_on_reload(self):
+        pl = Place()
+        rv = Review()
+        rv.place_id = pl.id
+        Review().place_id = pl.id
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(models.engine.indexes.AggregateIndex, "add",
+                          side_effect=AssertionError):
+            models.storage.reload()
+        self.assertEqual(2, models.storage.tally(Review, "place_id", pl.id))
+        models.storage.delete(models.storage.get(Review, rv.id))
+        self.assertEqual(1, models.storage.tally(Review, "place_id", pl.id))
+
+
+class TestFileStorage_shared_references(unittest.TestCase):
+    """Tests that equal ids and foreign keys share one string."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @staticmethod
+    def copy(text):
+        return "".join(list(text))
+
+    def test_assignment(self):
+        us = User()
+        rv = Review()
+        rv.user_id = self.copy(us.id)
+        pl = Place()
+        pl.amenity_ids = [self.copy(rv.user_id), 5]
+        self.assertIs(rv.user_id, pl.amenity_ids[0])
+        self.assertEqual(5, pl.amenity_ids[1])
+        rv.text = self.copy("great stay")
+        self.assertIsNot(rv.text, sys.intern("great stay"))
+
+    def test_reload(self):
+        pl = Place()
+        for i in range(2):
+            Review().place_id = self.copy(pl.id)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        place_ids = {id(rv.place_id) for rv in
+                     models.storage.all(Review).values()}
+        self.assertEqual(1, len(place_ids))
+        if not COMPACT:
+            self.assertEqual({id(models.storage.get(Place, pl.id).id)},
+                             place_ids)
+
+
+@unittest.skipIf(COMPACT, "the models are already slotted")
+class TestFileStorage_slotted_keys(unittest.TestCase):
+    """Tests that slotted models share their key with the storage."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.Place = slotted(Place, (slotted(BaseModel),))
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def stored_key(self, obj):
+        return next(key for key, value in models.storage.all().items()
+                    if value is obj)
+
+    def test_id_read_from_key(self):
+        pl = self.Place()
+        self.assertEqual("Place." + pl.id, pl._key)
+        self.assertIs(pl._key, self.stored_key(pl))
+        self.assertIs(pl, models.storage.get("Place", pl.id))
+        self.assertEqual(pl.id, pl.to_dict()["id"])
+        self.assertNotIn("_key", pl.to_dict())
+        pl.id = 7
+        self.assertEqual(7, pl.id)
+
+    def test_reload_keeps_one_key_string(self):
+        pl = self.Place()
+        pl.name = "Loft"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.dict(FileStorage.classes, {"Place": self.Place}):
+            models.storage.reload()
+        found = models.storage.get("Place", pl.id)
+        self.assertEqual("Loft", found.name)
+        self.assertIs(found._key, self.stored_key(found))
+        models.storage.delete(found)
+        self.assertIsNone(models.storage.get("Place", pl.id))
+
+
 if __name__ == "__main__":
     unittest.main()
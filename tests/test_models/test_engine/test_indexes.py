@@ -0,0 +1,395 @@
+#!/usr/bin/python3
+"""Unittests for indexes.py."""
+
+import random
+import unittest
+from models.engine.indexes import HashIndex, SortedIndex, GridIndex
+from models.engine.indexes import TextIndex, distance_km, in_box, tokenize
+from models.engine.indexes import BitmapIndex, Ordinals, AggregateIndex
+from models.engine.indexes import bit_count
+
+
+class Obj:
+    """Plain object carrying arbitrary attributes."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestHashIndex(unittest.TestCase):
+    """Tests the attribute hash index."""
+
+    def setUp(self):
+        self.index = HashIndex("city_id")
+        self.index.rebuild({
+            "a": Obj(city_id="c1"),
+            "b": Obj(city_id="c1"),
+            "c": Obj(city_id="c2"),
+            "d": Obj(),
+        })
+
+    def test_attrs(self):
+        self.assertEqual(("city_id",), self.index.attrs)
+
+    def test_lookup(self):
+        self.assertEqual({"a", "b"}, self.index.lookup("c1"))
+        self.assertEqual({"c"}, self.index.lookup("c2"))
+        self.assertEqual({"d"}, self.index.lookup(None))
+        self.assertEqual(set(), self.index.lookup("c3"))
+
+    def test_lookup_returns_a_copy(self):
+        self.index.lookup("c1").clear()
+        self.assertEqual(2, self.index.count("c1"))
+
+    def test_add_and_remove(self):
+        self.index.add("e", Obj(city_id="c2"))
+        self.assertEqual({"c", "e"}, self.index.lookup("c2"))
+        self.index.remove("c")
+        self.index.remove("e")
+        self.index.remove("missing")
+        self.assertEqual(set(), self.index.lookup("c2"))
+        self.assertEqual(0, self.index.count("c2"))
+
+    def test_unhashable_values(self):
+        self.index.add("e", Obj(city_id=["c1"]))
+        self.index.remove("e")
+        self.assertEqual(set(), self.index.lookup(["c1"]))
+        self.assertEqual(0, self.index.count(["c1"]))
+
+    def test_rebuild_replaces_content(self):
+        self.index.rebuild({"z": Obj(city_id="c9")})
+        self.assertEqual(set(), self.index.lookup("c1"))
+        self.assertEqual({"z"}, self.index.lookup("c9"))
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Tests the ordered numeric index."""
+
+    def setUp(self):
+        self.index = SortedIndex("price")
+        self.index.rebuild({
+            "a": Obj(price=100),
+            "b": Obj(price=50),
+            "c": Obj(price=120.5),
+            "d": Obj(price=50),
+            "e": Obj(price="cheap"),
+            "f": Obj(price=True),
+            "g": Obj(price=float("nan")),
+            "h": Obj(),
+        })
+
+    def test_full_range_is_ordered(self):
+        self.assertEqual(["b", "d", "a", "c"], list(self.index.range()))
+        self.assertEqual(["c", "a", "d", "b"],
+                         list(self.index.range(reverse=True)))
+
+    def test_bounds_are_inclusive(self):
+        self.assertEqual(["b", "d", "a"], list(self.index.range(50, 100)))
+        self.assertEqual(["a", "c"], list(self.index.range(low=51)))
+        self.assertEqual(["b", "d"], list(self.index.range(high=99.9)))
+        self.assertEqual([], list(self.index.range(101, 120)))
+        self.assertEqual(3, self.index.count(50, 100))
+        self.assertEqual(0, self.index.count(200, 100))
+
+    def test_incremental_updates(self):
+        self.index.add("i", Obj(price=75))
+        self.assertEqual(["b", "d", "i", "a"],
+                         list(self.index.range(50, 100)))
+        self.index.remove("d")
+        self.index.remove("e")
+        self.index.remove("i")
+        self.assertEqual(["b", "a", "c"], list(self.index.range()))
+
+    def test_blocks_match_brute_force(self):
+        rng = random.Random(5)
+        index = SortedIndex("price")
+        index.block_size = 3
+        values = {}
+        for step in range(600):
+            key = "k{}".format(rng.randrange(80))
+            index.remove(key)
+            values.pop(key, None)
+            if rng.random() < 0.7:
+                values[key] = rng.randrange(30)
+                index.add(key, Obj(price=values[key]))
+            if step % 7 == 0:
+                low, high = sorted(rng.sample(range(-2, 33), 2))
+                expected = sorted((v, k) for k, v in values.items()
+                                  if low <= v <= high)
+                self.assertEqual([k for v, k in expected],
+                                 list(index.range(low, high)))
+                self.assertEqual([k for v, k in reversed(expected)],
+                                 list(index.range(low, high, True)))
+                self.assertEqual(len(expected), index.count(low, high))
+                self.assertEqual(
+                    len([v for v in values.values() if low < v < high]),
+                    index.count(low, high, True, True))
+        self.assertEqual(len(values), index.count())
+
+    def test_equal_values_removed_by_key(self):
+        index = SortedIndex("price")
+        for key in "xyz":
+            index.add(key, Obj(price=0))
+        index.remove("y")
+        self.assertEqual(["x", "z"], list(index.range(0, 0)))
+
+
+class TestGridIndex(unittest.TestCase):
+    """Tests the latitude/longitude grid index."""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.points = {}
+        for i in range(500):
+            lat = rng.uniform(-89, 89)
+            lng = rng.uniform(-180, 180)
+            self.points["p{}".format(i)] = (lat, lng)
+        for i in range(200):
+            lat = rng.gauss(48.85, 0.3)
+            lng = rng.gauss(2.35, 0.3)
+            self.points["paris{}".format(i)] = (lat, lng)
+        self.points["east"] = (0.0, 179.9)
+        self.points["west"] = (0.0, -179.9)
+        objects = {key: Obj(latitude=lat, longitude=lng)
+                   for key, (lat, lng) in self.points.items()}
+        objects["bad"] = Obj(latitude="north", longitude=2.0)
+        objects["none"] = Obj()
+        self.index = GridIndex("latitude", "longitude")
+        self.index.rebuild(objects)
+
+    def brute_nearest(self, lat, lng, k):
+        return sorted((distance_km(lat, lng, *point), key)
+                      for key, point in self.points.items())[:k]
+
+    def brute_within(self, *box):
+        return {key for key, point in self.points.items()
+                if in_box(*point, *box)}
+
+    def test_distance(self):
+        self.assertAlmostEqual(343.5, distance_km(48.8566, 2.3522,
+                                                  51.5074, -0.1278), 0)
+        self.assertEqual(0, distance_km(10, 10, 10, 10))
+
+    def test_within(self):
+        for box in ((48.5, 2.0, 49.0, 2.5), (-10, -20, 10, 20),
+                    (-90, -180, 90, 180), (48.9, 2.4, 48.9, 2.4)):
+            self.assertEqual(self.brute_within(*box),
+                             set(self.index.within(*box)))
+
+    def test_within_across_antimeridian(self):
+        found = set(self.index.within(-1, 179, 1, -179))
+        self.assertIn("east", found)
+        self.assertIn("west", found)
+        self.assertEqual(self.brute_within(-1, 179, 1, -179), found)
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lng, k in ((48.85, 2.35, 10), (0, 0, 5), (-60, 100, 3),
+                            (0, 180, 2), (85, 0, 20), (48.85, 2.35, 400)):
+            expected = self.brute_nearest(lat, lng, k)
+            found = self.index.nearest(lat, lng, k)
+            self.assertEqual([key for d, key in expected],
+                             [key for d, key in found])
+
+    def test_nearest_accepted(self):
+        def accept(key):
+            return not key.startswith("paris")
+
+        expected = [(d, key) for d, key in self.brute_nearest(
+            48.85, 2.35, len(self.points)) if accept(key)][:7]
+        self.assertEqual(expected, self.index.nearest(48.85, 2.35, 7,
+                                                      accept))
+
+    def test_estimate(self):
+        for box in ((48.5, 2.0, 49.0, 2.5), (-1, 179, 1, -179)):
+            self.assertGreaterEqual(self.index.estimate(*box),
+                                    len(self.brute_within(*box)))
+        self.assertEqual(len(self.points),
+                         self.index.estimate(-90, -180, 90, 180))
+
+    def test_nearest_across_antimeridian(self):
+        found = self.index.nearest(0.0, 179.95, 2)
+        self.assertEqual({"east", "west"}, {key for d, key in found})
+
+    def test_nearest_edge_cases(self):
+        self.assertEqual([], self.index.nearest(0, 0, 0))
+        self.assertEqual([], GridIndex("a", "b").nearest(0, 0, 3))
+        self.assertEqual(len(self.points),
+                         len(self.index.nearest(0, 0, 10000)))
+
+    def test_remove(self):
+        self.index.remove("east")
+        self.index.remove("bad")
+        self.assertNotIn("east", set(self.index.within(-1, 179, 1, 180)))
+        self.index.add("east", Obj(latitude=10.0, longitude=10.0))
+        self.assertEqual(["east"], list(self.index.within(9, 9, 11, 11)))
+
+
+class TestTextIndex(unittest.TestCase):
+    """Tests the full-text inverted index."""
+
+    def setUp(self):
+        self.index = TextIndex("name", "description")
+        self.index.rebuild({
+            "a": Obj(name="Ocean loft", description="Quiet, ocean view."),
+            "b": Obj(name="City flat", description="View of the ocean"),
+            "c": Obj(name="Cabin", description=None),
+            "d": Obj(name=42),
+        })
+
+    def keys(self, query, limit=None):
+        return [key for score, key in self.index.search(query, limit)]
+
+    def test_tokenize(self):
+        self.assertEqual(["great", "view"], tokenize("Great VIEW!"))
+        self.assertEqual(["café", "2"], tokenize("Café #2"))
+
+    def test_terms_are_anded_and_ranked(self):
+        self.assertEqual(["a", "b"], self.keys("ocean"))
+        self.assertEqual(["a", "b"], self.keys("ocean view"))
+        self.assertEqual(["a"], self.keys("quiet ocean"))
+        self.assertEqual([], self.keys("ocean cabin"))
+        self.assertEqual(["c"], self.keys("CABIN"))
+
+    def test_phrases(self):
+        self.assertEqual(["a"], self.keys('"ocean view"'))
+        self.assertEqual(["b"], self.keys('"view of the ocean"'))
+        self.assertEqual([], self.keys('"view ocean"'))
+
+    def test_phrase_does_not_span_attributes(self):
+        self.assertEqual([], self.keys('"flat view"'))
+        self.assertEqual(["b"], self.keys('"city flat"'))
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(["a"], self.keys("ocean", 1))
+        self.assertEqual([], self.keys(""))
+        self.assertEqual([], self.keys('"" !!'))
+
+    def test_remove_and_update(self):
+        self.index.remove("a")
+        self.index.remove("d")
+        self.assertEqual(["b"], self.keys("ocean"))
+        self.index.add("a", Obj(name="Barn", description=""))
+        self.assertEqual(["a"], self.keys("barn"))
+        self.assertEqual([], self.keys("loft"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestOrdinals(unittest.TestCase):
+    """Tests the dense key numbering shared by bitmap indexes."""
+
+    def test_dense_and_reused(self):
+        ordinals = Ordinals()
+        ordinals.rebuild({"a": None, "b": None, "c": None})
+        self.assertEqual([0, 1, 2], [ordinals.ordinal(k) for k in "abc"])
+        ordinals.remove("b")
+        ordinals.remove("a")
+        self.assertIsNone(ordinals.ordinal("a"))
+        ordinals.add("d", None)
+        ordinals.add("d", None)
+        self.assertEqual(0, ordinals.ordinal("d"))
+        self.assertEqual(["d", "c"], list(ordinals.keys(0b101)))
+
+
+class TestBitmapIndex(unittest.TestCase):
+    """Tests the bitmap index over collection and plain attributes."""
+
+    def setUp(self):
+        self.index = BitmapIndex("amenity_ids")
+        self.index.rebuild({
+            "a": Obj(amenity_ids=["wifi", "pool"]),
+            "b": Obj(amenity_ids=["wifi"]),
+            "c": Obj(amenity_ids=["pool", "parking", ["bad"]]),
+            "d": Obj(amenity_ids="wifi"),
+        })
+
+    def keys(self, bits):
+        return set(self.index.keys(bits))
+
+    def test_bit_count(self):
+        for bits in (0, 1, 0b1011, (1 << 200) - 1, self.index.bitmap("wifi")):
+            self.assertEqual(bin(bits).count("1"), bit_count(bits))
+        self.assertEqual(200, bit_count((1 << 200) - 1))
+
+    def test_all_and_any(self):
+        self.assertEqual({"a", "b", "d"}, self.keys(self.index.bitmap("wifi")))
+        self.assertEqual({"a"}, self.keys(self.index.all_of(["wifi", "pool"])))
+        self.assertEqual({"b", "c", "d"},
+                         self.keys(self.index.any_of(["parking", "wifi"]) &
+                                   ~self.index.bitmap("pool") |
+                                   self.index.bitmap("parking")))
+        self.assertEqual(0, self.index.all_of(["wifi", "sauna"]))
+
+    def test_plan(self):
+        estimate, covered, fetch = self.index.plan(
+            [("all", ["pool"]), ("any", ["wifi", "parking"]),
+             ("lt", "x")])
+        self.assertEqual(2, estimate)
+        self.assertEqual([("all", ["pool"]), ("any", ["wifi", "parking"])],
+                         covered)
+        self.assertEqual({"a", "c"}, set(fetch()))
+        self.assertIsNone(self.index.plan([("all", [])]))
+
+    def test_remove_and_shared_ordinals(self):
+        ordinals = Ordinals()
+        ordinals.rebuild({"x": None, "y": None})
+        rooms = BitmapIndex("rooms")
+        rooms.ordinals = ordinals
+        rooms.rebuild({"x": Obj(rooms=2), "y": Obj(rooms=3)})
+        self.assertEqual(0b10, rooms.bitmap(3))
+        rooms.remove("y")
+        self.assertEqual(0, rooms.bitmap(3))
+        self.assertEqual(1, ordinals.ordinal("y"))
+        self.index.remove("a")
+        self.assertEqual({"c"}, self.keys(self.index.bitmap("pool")))
+
+    def test_ranges_and_facets(self):
+        rooms = BitmapIndex("rooms")
+        rooms.rebuild({"x": Obj(rooms=1), "y": Obj(rooms=2),
+                       "z": Obj(rooms=3), "w": Obj(rooms=3)})
+        self.assertEqual({"y", "z", "w"}, set(rooms.keys(rooms.between(2, 3))))
+        self.assertEqual({"y"},
+                         set(rooms.keys(rooms.between(1, 3, True, True))))
+        estimate, covered, fetch = rooms.plan([("gt", 1), ("lte", 2)])
+        self.assertEqual((1, {"y"}), (estimate, set(fetch())))
+        self.assertEqual({1: 1, 2: 1, 3: 2}, rooms.facets())
+        bits = rooms.bitmap_of(["z", "w", "q"])
+        self.assertEqual({3: 2}, rooms.facets(bits))
+        self.assertEqual(0, rooms.bitmap_of([]))
+
+
+class TestAggregateIndex(unittest.TestCase):
+    """Tests the per-value counts and sums."""
+
+    def setUp(self):
+        self.index = AggregateIndex("city_id", "price")
+        self.index.rebuild({
+            "a": Obj(city_id="c1", price=10),
+            "b": Obj(city_id="c1", price=2.5),
+            "c": Obj(city_id="c2", price="free"),
+            "d": Obj(city_id=["bad"], price=1),
+        })
+
+    def test_attrs(self):
+        self.assertEqual(("city_id", "price"), self.index.attrs)
+
+    def test_counts_and_totals(self):
+        self.assertEqual(2, self.index.count("c1"))
+        self.assertEqual(12.5, self.index.total("price", "c1"))
+        self.assertEqual(0, self.index.total("price", "c2"))
+        self.assertEqual(0, self.index.count("c3"))
+        self.assertEqual(0, self.index.count(["bad"]))
+        self.assertEqual({"c1": 2, "c2": 1}, self.index.counts())
+        self.assertEqual(2, self.index.distinct())
+
+    def test_add_and_remove(self):
+        self.index.remove("a")
+        self.index.remove("a")
+        self.assertEqual((1, 2.5), (self.index.count("c1"),
+                                    self.index.total("price", "c1")))
+        self.index.remove("c")
+        self.assertEqual(1, self.index.distinct())
+        self.index.add("e", Obj(city_id="c2", price=7))
+        self.assertEqual(7, self.index.total("price", "c2"))
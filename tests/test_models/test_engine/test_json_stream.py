@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""Unittests for json_stream.py."""
+
+import io
+import json
+import unittest
+from models.engine import json_stream
+
+
+class TestJsonStream_iter_object(unittest.TestCase):
+    """Tests reading a JSON object entry by entry."""
+
+    sample = {
+        "User.1": {"id": "1", "email": "a@b.com", "__class__": "User"},
+        "Place.2": {"id": "2", "amenity_ids": ["x", "y"], "price": 120},
+        "Review.3": {"id": "3", "text": "a } tricky, \"text\": {"},
+        "State.4": {"id": "4", "ratio": 1.5, "flag": None},
+    }
+
+    def entries(self, text, chunk_size=json_stream.CHUNK_SIZE):
+        f = io.StringIO(text)
+        return list(json_stream.iter_object(f, chunk_size))
+
+    def test_matches_json_load(self):
+        text = json.dumps(self.sample)
+        self.assertEqual(list(self.sample.items()), self.entries(text))
+
+    def test_any_chunk_size(self):
+        text = json.dumps(self.sample)
+        for chunk_size in (1, 2, 7, 64):
+            self.assertEqual(list(self.sample.items()),
+                             self.entries(text, chunk_size))
+
+    def test_whitespace(self):
+        text = json.dumps(self.sample, indent=4)
+        self.assertEqual(list(self.sample.items()), self.entries(text, 3))
+
+    def test_empty_object(self):
+        self.assertEqual([], self.entries("{}"))
+        self.assertEqual([], self.entries(" \n{ }\n", 1))
+
+    def test_repeated_names_shared(self):
+        text = json.dumps({str(i): {"name": i} for i in range(50)})
+        names = {id(name) for key, value in self.entries(text)[:-1]
+                 for name in value}
+        self.assertEqual(1, len(names))
+
+    def test_nested_object_before_cut(self):
+        sample = {"a": {"rules": {"pets": "no"}, "id": "1"},
+                  "b": {"id": "2"}, "c": {"x": {"y": 1}, "z": 2}}
+        text = json.dumps(sample)
+        for chunk_size in (5, 40, 1000):
+            self.assertEqual(list(sample.items()),
+                             self.entries(text, chunk_size))
+
+    def test_is_lazy(self):
+        f = io.StringIO(json.dumps(self.sample))
+        entries = json_stream.iter_object(f, 16)
+        self.assertEqual("User.1", next(entries)[0])
+        self.assertLess(f.tell(), len(json.dumps(self.sample)))
+
+    def test_empty_file(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.entries("")
+
+    def test_truncated(self):
+        text = json.dumps(self.sample)[:-1]
+        with self.assertRaises(json.JSONDecodeError):
+            self.entries(text, 5)
+
+    def test_malformed(self):
+        for text in ('[1, 2]', '{"a": 1 "b": 2}', '{"a" 1}', '{1: 2}'):
+            with self.assertRaises(json.JSONDecodeError):
+                self.entries(text, 2)
+
+
+class TestJsonStream_write_object(unittest.TestCase):
+    """Tests writing a JSON object from encoded entries."""
+
+    sample = TestJsonStream_iter_object.sample
+
+    def write(self, chunk_size=json_stream.CHUNK_SIZE):
+        f = io.StringIO()
+        entries = ((k, json.dumps(v)) for k, v in self.sample.items())
+        json_stream.write_object(f, entries, chunk_size)
+        return f.getvalue()
+
+    def test_round_trip(self):
+        self.assertEqual(self.sample, json.loads(self.write()))
+
+    def test_empty(self):
+        f = io.StringIO()
+        json_stream.write_object(f, iter(()))
+        self.assertEqual("{}", f.getvalue())
+
+    def test_writes_in_chunks(self):
+        f = io.StringIO()
+        writes = []
+        f.write = writes.append
+        entries = ((k, json.dumps(v)) for k, v in self.sample.items())
+        json_stream.write_object(f, entries, 16)
+        self.assertGreater(len(writes), 1)
+        self.assertEqual(self.sample, json.loads("".join(writes)))
+
+    def test_consumes_entries_lazily(self):
+        consumed = []
+
+        def entries():
+            for k, v in self.sample.items():
+                consumed.append(k)
+                yield k, json.dumps(v)
+
+        f = io.StringIO()
+        first_write = []
+        f.write = lambda text: first_write.append(len(consumed))
+        json_stream.write_object(f, entries(), 1)
+        self.assertEqual(1, first_write[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
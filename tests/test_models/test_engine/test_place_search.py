@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""Unittests for place_search.py."""
+
+import random
+import models
+import unittest
+from models.engine.file_storage import FileStorage
+from models.engine.indexes import distance_km, in_box
+from models.place import Place
+
+
+class TestSearchPlaces(unittest.TestCase):
+    """Tests the composite listing search against brute force."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        rng = random.Random(11)
+        self.places = []
+        for i in range(400):
+            pl = Place()
+            pl.city_id = "c{}".format(i % 4)
+            pl.price_by_night = rng.randint(20, 400)
+            pl.max_guest = rng.randint(1, 8)
+            pl.latitude = rng.uniform(40.0, 42.0)
+            pl.longitude = rng.uniform(-75.0, -73.0)
+            pl.amenity_ids = rng.sample(["wifi", "pool", "parking"],
+                                        rng.randint(0, 3))
+            self.places.append(pl)
+        self.box = (40.5, -74.5, 41.0, -74.0)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def expected(self, keep, rank, offset=0, limit=20, reverse=False):
+        found = sorted((pl for pl in self.places if keep(pl)),
+                       key=lambda pl: (rank(pl), "Place." + pl.id),
+                       reverse=reverse)
+        return ["Place." + pl.id for pl in found[offset:offset + limit]]
+
+    def test_city_price_guests_amenities(self):
+        found = models.storage.search_places(
+            city_id="c1", price_min=50, price_max=250, guests=3,
+            amenities=["wifi"], offset=5, limit=10)
+        self.assertEqual(self.expected(
+            lambda pl: pl.city_id == "c1" and
+            50 <= pl.price_by_night <= 250 and pl.max_guest >= 3 and
+            "wifi" in pl.amenity_ids,
+            lambda pl: pl.price_by_night, 5, 10), list(found))
+
+    def test_viewport_by_distance(self):
+        found = models.storage.search_places(box=self.box, guests=2,
+                                             order="distance")
+        center = (40.75, -74.25)
+        self.assertEqual(self.expected(
+            lambda pl: in_box(pl.latitude, pl.longitude, *self.box) and
+            pl.max_guest >= 2,
+            lambda pl: distance_km(*center, pl.latitude, pl.longitude)),
+            list(found))
+
+    def test_viewport_by_price_descending(self):
+        found = models.storage.search_places(
+            box=self.box, amenities=["pool", "parking"], order="-price")
+        self.assertEqual(self.expected(
+            lambda pl: in_box(pl.latitude, pl.longitude, *self.box) and
+            {"pool", "parking"} <= set(pl.amenity_ids),
+            lambda pl: pl.price_by_night, reverse=True), list(found))
+
+    def test_big_viewport_walks_in_order(self):
+        box = (40.2, -74.9, 41.8, -73.1)
+        for order in ("price", "-price"):
+            found = models.storage.search_places(
+                box=box, amenities=["wifi"], order=order, offset=4)
+            self.assertEqual(self.expected(
+                lambda pl: in_box(pl.latitude, pl.longitude, *box) and
+                "wifi" in pl.amenity_ids,
+                lambda pl: pl.price_by_night, 4, 20, order == "-price"),
+                list(found))
+        found = models.storage.search_places(box=box, guests=3,
+                                             order="distance")
+        self.assertEqual(self.expected(
+            lambda pl: in_box(pl.latitude, pl.longitude, *box) and
+            pl.max_guest >= 3,
+            lambda pl: distance_km(41.0, -74.0, pl.latitude, pl.longitude)),
+            list(found))
+
+    def test_same_ties_with_and_without_box(self):
+        world = (-90, -180, 90, 180)
+        for order in ("price", "-price"):
+            self.assertEqual(
+                list(models.storage.search_places(order=order, limit=50)),
+                list(models.storage.search_places(box=world, order=order,
+                                                  limit=50)))
+
+    def test_selective_filters_drive_a_big_viewport(self):
+        box = (39.0, -76.0, 43.0, -72.0)
+        found = models.storage.search_places(box=box, city_id="c2",
+                                             price_max=60)
+        self.assertEqual(self.expected(
+            lambda pl: pl.city_id == "c2" and pl.price_by_night <= 60,
+            lambda pl: pl.price_by_night), list(found))
+
+    def test_nearest_without_filters(self):
+        near = (41.0, -74.0)
+        found = models.storage.search_places(order="distance", near=near,
+                                             offset=3, limit=7)
+        self.assertEqual(self.expected(
+            lambda pl: True,
+            lambda pl: distance_km(*near, pl.latitude, pl.longitude),
+            3, 7), list(found))
+
+    def test_bad_order(self):
+        with self.assertRaises(ValueError):
+            models.storage.search_places(order="rating")
+        with self.assertRaises(ValueError):
+            models.storage.search_places(order="distance")
+
+
+if __name__ == "__main__":
+    unittest.main()
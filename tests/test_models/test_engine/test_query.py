@@ -0,0 +1,271 @@
+#!/usr/bin/python3
+"""Unittests for query.py."""
+
+import random
+import models
+import unittest
+from unittest.mock import patch
+from models.engine.file_storage import FileStorage
+from models.engine.query import Query
+from models.place import Place
+from models.state import State
+
+
+class TestQuery(unittest.TestCase):
+    """Tests storage queries and their plans."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        rng = random.Random(7)
+        self.places = []
+        for i in range(300):
+            pl = Place()
+            pl.city_id = "c{}".format(i % 5)
+            pl.price_by_night = rng.randint(10, 300)
+            pl.number_rooms = rng.randint(1, 4)
+            pl.name = "place {}".format(i)
+            pl.amenity_ids = rng.sample(["wifi", "pool", "parking"],
+                                        rng.randint(0, 3))
+            self.places.append(pl)
+        self.odd = Place()
+        self.odd.price_by_night = "ask"
+        self.places.append(self.odd)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def expected(self, keep, attr=None, reverse=False):
+        found = [pl for pl in self.places if keep(pl)]
+        if attr is not None:
+            numbers = [pl for pl in found
+                       if type(getattr(pl, attr)) in (int, float)]
+            others = [pl for pl in found if pl not in numbers]
+            numbers.sort(key=lambda pl: (getattr(pl, attr), "Place." + pl.id),
+                         reverse=reverse)
+            others.sort(key=lambda pl: (getattr(pl, attr), "Place." + pl.id),
+                        reverse=reverse)
+            found = numbers + others
+        return ["Place." + pl.id for pl in found]
+
+    def test_query_returns_a_query(self):
+        self.assertIsInstance(models.storage.query(Place), Query)
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            models.storage.query(Place, price_by_night__near=3)
+
+    def test_no_filters_is_a_scan(self):
+        query = models.storage.query(Place)
+        self.assertEqual(len(self.places), len(query.all()))
+        self.assertIsNone(query.explain()["index"])
+        self.assertEqual(len(self.places), query.count())
+
+    def test_equality_uses_hash_index(self):
+        query = models.storage.query(Place, city_id="c2", number_rooms=3)
+        plan = query.explain()
+        self.assertEqual("HashIndex(city_id)", plan["index"])
+        self.assertEqual([("number_rooms", "eq", 3)], plan["filters"])
+        self.assertEqual(
+            set(self.expected(lambda pl: pl.city_id == "c2" and
+                              pl.number_rooms == 3)),
+            set(query.all()))
+
+    def test_most_selective_index_drives(self):
+        query = models.storage.query(Place, city_id="c2",
+                                     price_by_night__gte=295)
+        plan = query.explain()
+        self.assertEqual("SortedIndex(price_by_night)", plan["index"])
+        self.assertEqual([("city_id", "eq", "c2")], plan["filters"])
+
+    def test_range_and_order_from_one_index(self):
+        query = models.storage.query(
+            Place, price_by_night__gt=50, price_by_night__lte=120
+        ).order_by("-price_by_night")
+        self.assertEqual("index", query.explain()["order"])
+        self.assertEqual([], query.explain()["filters"])
+        expected = self.expected(
+            lambda pl: pl is not self.odd and 50 < pl.price_by_night <= 120,
+            "price_by_night", True)
+        self.assertEqual(expected, list(query.all()))
+        self.assertEqual(len(expected), query.count())
+
+    def test_in(self):
+        query = models.storage.query(Place, number_rooms__in=[1, 4],
+                                     city_id__in=("c0", "c1"))
+        self.assertEqual(
+            set(self.expected(lambda pl: pl.number_rooms in (1, 4) and
+                              pl.city_id in ("c0", "c1"))),
+            set(query.all()))
+
+    def test_sort_and_pagination(self):
+        query = models.storage.query(Place, city_id="c3").order_by("name")
+        self.assertEqual("sort", query.explain()["order"])
+        expected = self.expected(lambda pl: pl.city_id == "c3", "name")
+        self.assertEqual(expected, list(query.all()))
+        self.assertEqual(expected[5:15],
+                         list(query.offset(5).limit(10).all()))
+
+    def test_order_scan_keeps_non_numbers_last(self):
+        query = models.storage.query(Place).order_by("price_by_night")
+        query.limit(len(self.places))
+        self.assertEqual("index", query.explain()["order"])
+        expected = self.expected(lambda pl: True, "price_by_night")
+        self.assertEqual(expected, list(query.all()))
+        self.assertEqual(expected[-1], "Place." + self.odd.id)
+        query = models.storage.query(Place).order_by("-price_by_night")
+        self.assertEqual(expected[-1], list(query.all())[-1])
+
+    def test_ordered_index_beats_big_driver_with_small_limit(self):
+        query = models.storage.query(Place, city_id="c1").order_by(
+            "price_by_night").limit(3)
+        self.assertEqual("SortedIndex(price_by_night)",
+                         query.explain()["index"])
+        expected = self.expected(lambda pl: pl.city_id == "c1",
+                                 "price_by_night")
+        self.assertEqual(expected[:3], list(query.all()))
+
+    def test_ordered_walk_keeps_range_bounds(self):
+        query = models.storage.query(
+            Place, number_rooms=2, price_by_night__gte=100).order_by(
+                "price_by_night").limit(2)
+        plan = query.explain()
+        self.assertEqual("SortedIndex(price_by_night)", plan["index"])
+        self.assertEqual([("price_by_night", "gte", 100)], plan["covered"])
+        expected = self.expected(
+            lambda pl: pl.number_rooms == 2 and pl is not self.odd and
+            pl.price_by_night >= 100, "price_by_night")
+        self.assertEqual(expected[:2], list(query.all()))
+
+    def test_where(self):
+        def even(pl):
+            return pl.price_by_night in range(0, 400, 2)
+
+        query = models.storage.query(Place, number_rooms__gte=2).where(
+            even)
+        expected = self.expected(lambda pl: pl.number_rooms >= 2 and
+                                 even(pl))
+        self.assertEqual(len(expected), query.count())
+        expected = self.expected(lambda pl: pl.number_rooms >= 2 and
+                                 even(pl), "price_by_night", True)
+        self.assertEqual(expected[:4], list(query.order_by(
+            "-price_by_night").limit(4).all()))
+
+    def test_limited_sort_uses_bounded_heaps(self):
+        query = models.storage.query(Place, city_id="c3").order_by("name")
+        expected = self.expected(lambda pl: pl.city_id == "c3", "name")
+        with patch.object(Query, "_Query__sort",
+                          side_effect=AssertionError):
+            self.assertEqual(expected[4:9],
+                             list(query.offset(4).limit(5).all()))
+        self.places[0].name = 5
+        self.places[1].name = 2.5
+        for reverse in (False, True):
+            query = models.storage.query(Place).order_by(
+                "-name" if reverse else "name")
+            expected = self.expected(lambda pl: True, "name", reverse)
+            self.assertEqual(expected[:3], list(query.limit(3).all()))
+            self.assertEqual(expected[-2:],
+                             list(query.offset(len(expected) - 2).all()))
+
+    def test_top(self):
+        expected = self.expected(lambda pl: pl.city_id == "c2" and
+                                 pl is not self.odd, "price_by_night")
+        self.assertEqual(expected[:20], list(models.storage.top(
+            Place, "price_by_night", 20, city_id="c2")))
+        expected = self.expected(lambda pl: pl is not self.odd,
+                                 "price_by_night", True)
+        self.assertEqual(expected[:5], list(models.storage.top(
+            Place, "-price_by_night", 5)))
+        self.assertEqual({}, models.storage.top(Place, "name", 0))
+        self.assertEqual({}, models.storage.query(Place).order_by(
+            "name").limit(0).all())
+
+    def test_first(self):
+        query = models.storage.query(Place).order_by("price_by_night")
+        cheapest = min(self.places[:-1], key=lambda pl: pl.price_by_night)
+        self.assertEqual(cheapest.price_by_night,
+                         query.first().price_by_night)
+        self.assertIsNone(models.storage.query(Place, city_id="x").first())
+
+    def test_range_on_unindexed_class(self):
+        st = State()
+        st.rank = 3
+        State().rank = "high"
+        self.assertEqual(["State." + st.id],
+                         list(models.storage.query(State, rank__lt=5).all()))
+
+    def test_plan_follows_updates(self):
+        pl = self.places[0]
+        pl.city_id = "moved"
+        self.assertEqual(["Place." + pl.id],
+                         list(models.storage.query(Place,
+                                                   city_id="moved").all()))
+
+    def test_amenity_filters_use_bitmap_index(self):
+        query = models.storage.query(Place,
+                                     amenity_ids__all=["wifi", "pool"])
+        self.assertEqual("BitmapIndex(amenity_ids)",
+                         query.explain()["index"])
+        self.assertEqual([], query.explain()["filters"])
+        self.assertEqual(
+            set(self.expected(lambda pl: {"wifi", "pool"} <=
+                              set(pl.amenity_ids))),
+            set(query.all()))
+        query = models.storage.query(Place, amenity_ids__contains="pool",
+                                     amenity_ids__any=["wifi", "parking"])
+        self.assertEqual(
+            set(self.expected(lambda pl: "pool" in pl.amenity_ids and
+                              set(pl.amenity_ids) & {"wifi", "parking"})),
+            set(query.all()))
+        self.assertEqual(query.count(), len(query.all()))
+
+    def test_amenity_filters_compose(self):
+        query = models.storage.query(
+            Place, amenity_ids__contains="parking", city_id="c1",
+            price_by_night__lte=100).order_by("price_by_night")
+        self.assertEqual(
+            self.expected(lambda pl: "parking" in pl.amenity_ids and
+                          pl.city_id == "c1" and pl is not self.odd and
+                          pl.price_by_night <= 100, "price_by_night"),
+            list(query.all()))
+
+    def test_bitmap_indexes_are_anded(self):
+        query = models.storage.query(Place, number_rooms__gte=3,
+                                     amenity_ids__contains="wifi")
+        self.assertEqual("BitmapIndex(amenity_ids)&"
+                         "BitmapIndex(number_rooms)",
+                         query.explain()["index"])
+        self.assertEqual([], query.explain()["filters"])
+        self.assertEqual(
+            set(self.expected(lambda pl: pl.number_rooms >= 3 and
+                              "wifi" in pl.amenity_ids)),
+            set(query.all()))
+
+    def test_facets(self):
+        counts = {}
+        for pl in self.places:
+            counts[pl.number_rooms] = counts.get(pl.number_rooms, 0) + 1
+        self.assertEqual(counts, models.storage.facets(Place,
+                                                       "number_rooms"))
+        counts = {}
+        for pl in self.places:
+            if pl.city_id == "c2" and "pool" in pl.amenity_ids:
+                counts[pl.number_rooms] = counts.get(pl.number_rooms, 0) + 1
+        self.assertEqual(counts, models.storage.facets(
+            Place, "number_rooms", city_id="c2",
+            amenity_ids__contains="pool"))
+        self.assertEqual({"": 1, "c0": 60, "c1": 60, "c2": 60, "c3": 60,
+                          "c4": 60}, models.storage.facets(Place, "city_id"))
+
+    def test_bitmap_follows_updates(self):
+        pl = self.places[0]
+        pl.amenity_ids = ["sauna"]
+        self.assertEqual(["Place." + pl.id], list(models.storage.query(
+            Place, amenity_ids__contains="sauna").all()))
+        models.storage.delete(pl)
+        self.assertEqual({}, models.storage.query(
+            Place, amenity_ids__contains="sauna").all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.base_model import COMPACT
 from models.place import Place
 
 
@@ -26,66 +27,77 @@ class TestPlace_instantiation(unittest.TestCase):
     def test_updated_at_is_public_datetime(self):
         self.assertEqual(datetime, type(Place().updated_at))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_city_id_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(str, type(Place.city_id))
         self.assertIn("city_id", dir(pl))
         self.assertNotIn("city_id", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_user_id_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(str, type(Place.user_id))
         self.assertIn("user_id", dir(pl))
         self.assertNotIn("user_id", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_name_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(str, type(Place.name))
         self.assertIn("name", dir(pl))
         self.assertNotIn("name", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_description_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(str, type(Place.description))
         self.assertIn("description", dir(pl))
         self.assertNotIn("desctiption", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_number_rooms_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(int, type(Place.number_rooms))
         self.assertIn("number_rooms", dir(pl))
         self.assertNotIn("number_rooms", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_number_bathrooms_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(int, type(Place.number_bathrooms))
         self.assertIn("number_bathrooms", dir(pl))
         self.assertNotIn("number_bathrooms", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_max_guest_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(int, type(Place.max_guest))
         self.assertIn("max_guest", dir(pl))
         self.assertNotIn("max_guest", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_price_by_night_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(int, type(Place.price_by_night))
         self.assertIn("price_by_night", dir(pl))
         self.assertNotIn("price_by_night", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_latitude_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(float, type(Place.latitude))
         self.assertIn("latitude", dir(pl))
         self.assertNotIn("latitude", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_longitude_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(float, type(Place.longitude))
         self.assertIn("longitude", dir(pl))
         self.assertNotIn("longitude", pl.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_amenity_ids_is_public_class_attribute(self):
         pl = Place()
         self.assertEqual(list, type(Place.amenity_ids))
@@ -121,6 +133,7 @@ class TestPlace_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, plstr)
         self.assertIn("'updated_at': " + dt_repr, plstr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         pl = Place(None)
         self.assertNotIn(None, pl.__dict__.values())
@@ -229,6 +242,7 @@ class TestPlace_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(pl.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         pl = Place()
         self.assertNotEqual(pl.to_dict(), pl.__dict__)
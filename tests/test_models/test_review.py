@@ -5,6 +5,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.base_model import COMPACT
 from models.review import Review
 
 
@@ -26,18 +27,21 @@ class TestReview_instantiation(unittest.TestCase):
     def test_updated_at_is_public_datetime(self):
         self.assertEqual(datetime, type(Review().updated_at))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_place_id_is_public_class_attribute(self):
         rv = Review()
         self.assertEqual(str, type(Review.place_id))
         self.assertIn("place_id", dir(rv))
         self.assertNotIn("place_id", rv.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_user_id_is_public_class_attribute(self):
         rv = Review()
         self.assertEqual(str, type(Review.user_id))
         self.assertIn("user_id", dir(rv))
         self.assertNotIn("user_id", rv.__dict__)
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_text_is_public_class_attribute(self):
         rv = Review()
         self.assertEqual(str, type(Review.text))
@@ -73,6 +77,7 @@ class TestReview_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, rvstr)
         self.assertIn("'updated_at': " + dt_repr, rvstr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         rv = Review(None)
         self.assertNotIn(None, rv.__dict__.values())
@@ -181,6 +186,7 @@ class TestReview_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(rv.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         rv = Review()
         self.assertNotEqual(rv.to_dict(), rv.__dict__)
@@ -5,6 +5,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.base_model import COMPACT
 from models.state import State
 
 
@@ -26,6 +27,7 @@ class TestState_instantiation(unittest.TestCase):
     def test_updated_at_is_public_datetime(self):
         self.assertEqual(datetime, type(State().updated_at))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_name_is_public_class_attribute(self):
         st = State()
         self.assertEqual(str, type(State.name))
@@ -61,6 +63,7 @@ class TestState_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, ststr)
         self.assertIn("'updated_at': " + dt_repr, ststr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         st = State(None)
         self.assertNotIn(None, st.__dict__.values())
@@ -169,6 +172,7 @@ class TestState_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(st.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         st = State()
         self.assertNotEqual(st.to_dict(), st.__dict__)
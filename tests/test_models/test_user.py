@@ -5,6 +5,7 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.base_model import COMPACT
 from models.user import User
 
 
@@ -26,15 +27,19 @@ class TestUser_instantiation(unittest.TestCase):
     def test_updated_at_is_public_datetime(self):
         self.assertEqual(datetime, type(User().updated_at))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_email_is_public_str(self):
         self.assertEqual(str, type(User.email))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_password_is_public_str(self):
         self.assertEqual(str, type(User.password))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_first_name_is_public_str(self):
         self.assertEqual(str, type(User.first_name))
 
+    @unittest.skipIf(COMPACT, "compact models keep defaults in _defaults")
     def test_last_name_is_public_str(self):
         self.assertEqual(str, type(User.last_name))
 
@@ -67,6 +72,7 @@ class TestUser_instantiation(unittest.TestCase):
         self.assertIn("'created_at': " + dt_repr, usstr)
         self.assertIn("'updated_at': " + dt_repr, usstr)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_args_unused(self):
         us = User(None)
         self.assertNotIn(None, us.__dict__.values())
@@ -175,6 +181,7 @@ class TestUser_to_dict(unittest.TestCase):
         }
         self.assertDictEqual(us.to_dict(), tdict)
 
+    @unittest.skipIf(COMPACT, "compact models have no __dict__")
     def test_contrast_to_dict_dunder_dict(self):
         us = User()
         self.assertNotEqual(us.to_dict(), us.__dict__)